@@ -0,0 +1,74 @@
+"""validate_storyboard 扩展性基准：在生成的大型 storyboard 上测量校验耗时，确认随镜头数线性增长。
+
+每个镜头引用 3 个资产、带 2 组各 2 张候选图与 1 条视频记录；资产数为镜头数的 1/10。
+
+用法（在 storyboard-editor 目录下）：
+    python benchmarks/validate_scaling.py                    # 1250 / 2500 / 5000 / 10000 个镜头，各 5 次取中位数
+    python benchmarks/validate_scaling.py --sizes 10000 20000 -n 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from validate_storyboard import validate_storyboard  # noqa: E402
+
+
+def make_board(shots: int) -> dict:
+    asset_count = max(3, shots // 10)
+    assets = [
+        {
+            "id": f"asset_{i}",
+            "name": f"资产{i}",
+            "desc": "",
+            "visual_state": "",
+            "image_urls": [f"file:///assets/{i}.png"],
+        }
+        for i in range(asset_count)
+    ]
+    scene_board = []
+    for i in range(shots):
+        frames = [
+            [
+                {"status": "completed", "taskId": f"img-{i}-{g}-{c}", "image_urls": [f"file:///img/{i}_{g}_{c}.png"]}
+                for c in range(2)
+            ]
+            for g in range(2)
+        ]
+        scene_board.append({
+            "shot_id": i + 1,
+            "scene_index": i,
+            "duration": 5,
+            "active_assets": [f"asset_{(i + k) % asset_count}" for k in range(3)],
+            "picture": {"frames": frames},
+            "videos": [{"status": "isloading", "taskId": f"vid-{i}", "video_urls": []}],
+        })
+    return {"scene_board": scene_board, "art_materials": {"asset": assets}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="validate_storyboard 扩展性基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1250, 2500, 5000, 10000], help="镜头数")
+    parser.add_argument("-n", type=int, default=5, help="每个规模的重复次数")
+    args = parser.parse_args()
+
+    base = None
+    for shots in args.sizes:
+        board = make_board(shots)
+        samples = []
+        for _ in range(args.n):
+            t0 = time.perf_counter()
+            is_valid, errors = validate_storyboard(board)
+            samples.append(time.perf_counter() - t0)
+        assert is_valid and not errors, [str(e) for e in errors[:5]]
+        median = statistics.median(samples)
+        per_shot = median / shots * 1e6
+        base = base or per_shot
+        print(f"{shots:>7} shots: median {median * 1000:8.1f} ms, {per_shot:6.2f} µs/shot ({per_shot / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
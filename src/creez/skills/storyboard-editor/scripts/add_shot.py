@@ -3,13 +3,7 @@ Add a new shot to the storyboard at a specified position.
 """
 
 from typing import Optional
-from skill_utils import (
-    load_storyboard, 
-    save_storyboard, 
-    create_shot_template,
-    get_next_shot_id,
-    update_scene_indices
-)
+from skill_utils import Storyboard, append_operation, create_shot_template, journal_enabled, storyboard_lock
 
 
 def add_shot(
@@ -20,6 +14,7 @@ def add_shot(
     description: str = "",
     duration: float = 0,
     active_assets: list = None,
+    output_path: Optional[str] = None,
 ) -> dict:
     """
     Add a new shot to the storyboard.
@@ -32,41 +27,47 @@ def add_shot(
         description: Shot description
         duration: Shot duration in seconds
         active_assets: List of asset file_ids to use
+        output_path: Save to this path instead of overwriting storyboard_path
     
     Returns:
         dict with 'success', 'shot_id', 'scene_index', 'message'
     """
-    # Load storyboard
-    storyboard = load_storyboard(storyboard_path)
-    scene_board = storyboard['scene_board']
+    # Hold the board lock across load -> allocate shot_id -> write, so concurrent
+    # add_shot calls never hand out the same shot_id or drop each other's shots
+    with storyboard_lock(storyboard_path):
+        journaled = journal_enabled() and not output_path
+        # Load storyboard; only a save back to storyboard_path folds the replayed journal in,
+        # a journaled add just appends and leaves it pending
+        storyboard = Storyboard.load(storyboard_path, consume_journal=not journaled and not output_path)
+        scene_board = storyboard.scene_board
     
-    # Get next shot_id
-    shot_id = get_next_shot_id(scene_board)
+        # Get next shot_id
+        shot_id = storyboard.next_shot_id()
     
-    # Determine insert position
-    if position is None:
-        position = len(scene_board)
-    elif position < 0:
-        position = 0
-    elif position > len(scene_board):
-        position = len(scene_board)
+        # Determine insert position
+        if position is None:
+            position = len(scene_board)
+        elif position < 0:
+            position = 0
+        elif position > len(scene_board):
+            position = len(scene_board)
     
-    # Create new shot
-    new_shot = create_shot_template(shot_id, position)
-    new_shot['type'] = shot_type
-    new_shot['movement'] = movement
-    new_shot['description'] = description
-    new_shot['duration'] = duration
-    new_shot['active_assets'] = active_assets or []
-    
-    # Insert shot
-    scene_board.insert(position, new_shot)
-    
-    # Update all scene_index values
-    update_scene_indices(scene_board)
-    
-    save_storyboard(storyboard, storyboard_path)
+        # Create new shot
+        new_shot = create_shot_template(shot_id, position)
+        new_shot['type'] = shot_type
+        new_shot['movement'] = movement
+        new_shot['description'] = description
+        new_shot['duration'] = duration
+        new_shot['active_assets'] = active_assets or []
     
+        if journaled:
+            # Append to <storyboard>.journal instead of rewriting the whole file
+            append_operation(storyboard_path, {'op': 'add_shot', 'shot': new_shot, 'position': position})
+        else:
+            # Insert shot (scene_index of following shots is renumbered)
+            storyboard.insert_shot(new_shot, position)
+            storyboard.save(output_path or storyboard_path)
+
     return {
         'success': True,
         'shot_id': shot_id,
@@ -0,0 +1,235 @@
+"""
+调用后端接口用的 HTTP 客户端与生成任务的公共流程（生图/生视频脚本共用）。
+
+- post_json：每个线程对每个后端地址复用一条 keep-alive 连接（http.client），
+  避免 urllib 每个请求都重新建立 TCP/TLS 连接。成功返回解析后的 JSON，失败返回 {"_error": "..."}
+- run_generation_batch：批量模式的公共流程（一次写入全部占位 → 参考图去重转换 → 并发提交 → 写回后端 task_id → 汇总结果）
+- record_backend_task_ids：占位先用脚本生成的 taskId（同时作为 Idempotency-Key）写入，后端另行生成任务的 task_id，
+  提交成功后把占位的 taskId 换成后端返回的 task_id，sync_tasks.py 与 Creez 前端才能按它轮询
+"""
+
+import os
+import json
+import http.client
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from skill_utils import StoryboardLockTimeout, write_shot_operations
+
+# 与 Creez_backend 一致：后端从 Header 的 X-User-Id 获取 user_id（见 middleware/auth.require_user_id）
+USER_ID_HEADER = "X-User-Id"
+# 与 Creez_backend 一致：重试/重复提交携带同一 key，后端返回已有 task_id，不会重复生成
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# 测试用默认值，未传 --user_id 且无环境变量时使用，保证本地/Agent 调用能通过后端校验
+DEFAULT_USER_ID = "cbaef461-ae6e-46d8-bd06-cb4b94d68349"
+# 批量模式同时进行的接口请求数；后端按 bulk 优先级排队，调大只会增加排队中的任务
+BATCH_MAX_WORKERS = int(os.environ.get("STORYBOARD_BATCH_MAX_WORKERS", "4"))
+
+_local = threading.local()
+
+
+def _connections() -> dict:
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    return conns
+
+
+def _connection(base_url: str, timeout: float):
+    parts = urlsplit(base_url)
+    key = (parts.scheme, parts.netloc)
+    conn = _connections().get(key)
+    if conn is None:
+        cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        conn = _connections()[key] = cls(parts.netloc, timeout=timeout)
+    return key, conn, parts.path.rstrip("/")
+
+
+def _discard(key) -> None:
+    conn = _connections().pop(key, None)
+    if conn is not None:
+        conn.close()
+
+
+def post_json(
+    base_url: str,
+    path: str,
+    payload: dict,
+    user_id: str = "",
+    idempotency_key: str = "",
+    timeout: float = 60,
+    retry: bool = False,
+) -> dict:
+    """POST JSON 到 base_url + path。
+    复用的连接若已被服务端关闭，重连后重发一次：仅限带 Idempotency-Key（重发不会重复创建任务）
+    或 retry=True 的只读请求（如轮询）。"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if user_id and str(user_id).strip():
+        headers[USER_ID_HEADER] = str(user_id).strip()
+    if idempotency_key:
+        headers[IDEMPOTENCY_KEY_HEADER] = idempotency_key
+
+    for attempt in range(2):
+        key, conn, prefix = _connection(base_url, timeout)
+        try:
+            conn.request("POST", prefix + path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except (http.client.HTTPException, OSError) as e:
+            _discard(key)
+            if attempt == 0 and (idempotency_key or retry):
+                continue
+            return {"_error": str(e)}
+        if resp.will_close:
+            _discard(key)
+        if resp.status >= 400:
+            return {"_error": f"HTTP Error {resp.status}: {resp.reason}"}
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError as e:
+            return {"_error": str(e)}
+
+
+def resolve_user_id(user_id: str = "") -> str:
+    """user_id 未传时从环境变量 CREEZ_USER_ID 读取，再缺省则用 DEFAULT_USER_ID（测试用）"""
+    return (user_id or "").strip() or os.environ.get("CREEZ_USER_ID", "").strip() or DEFAULT_USER_ID
+
+
+def resolve_base_url(backend_base_url: str = "") -> str:
+    return (backend_base_url or os.environ.get("BACKEND_BASE_URL", "")).strip()
+
+
+def load_batch_items(value: str) -> list:
+    """--batch 参数：JSON 数组或其文件路径；格式错误时抛 ValueError"""
+    if os.path.isfile(value):
+        with open(value, "r", encoding="utf-8") as f:
+            items = json.load(f)
+    else:
+        items = json.loads(value)
+    if not isinstance(items, list):
+        raise ValueError("batch must be a JSON array")
+    return items
+
+
+def record_backend_task_ids(storyboard_path: str, renames: List[Tuple[int, str, str]]) -> Optional[str]:
+    """renames 为 [(shot_id, 占位 taskId, 后端 task_id)]，在一次加锁读写中把占位的 taskId 换成后端 task_id
+    （journal 模式下追加 update_task_status 操作）。成功返回 None，storyboard 被占用时返回错误信息"""
+    ops = [
+        {"op": "update_task_status", "shot_id": shot_id, "task_id": placeholder_id, "fields": {"taskId": backend_id}}
+        for shot_id, placeholder_id, backend_id in renames
+        if backend_id and backend_id != placeholder_id
+    ]
+    if not ops:
+        return None
+    try:
+        write_shot_operations(storyboard_path, ops)
+    except StoryboardLockTimeout as e:
+        return str(e)
+    return None
+
+
+def run_generation_batch(
+    storyboard_path: str,
+    items: list,
+    parse_item: Callable[[object], dict],
+    build_payload: Callable[[dict, Callable[[str, int], str]], dict],
+    api_path: str,
+    label: str,
+    user_id: str = "",
+    backend_base_url: str = "",
+    max_workers: int = BATCH_MAX_WORKERS,
+) -> dict:
+    """
+    批量发起生成任务。parse_item(item) 校验一项并返回 job，不合法时抛 ValueError（只记入该项结果）；
+    job 需含 shot_id、task_id、op（写入 isloading 占位的日志操作）与 references（[(file_url, max_side)]）。
+    1. 所有占位在一次加锁读写中写入 storyboard（journal 模式下追加到日志）
+    2. 所有 job 的参考图按 (file_url, max_side) 去重后只上传/编码一次
+    3. build_payload(job, resolve) 生成请求体，resolve(url, max_side) 返回转换后的 url；
+       用 max_workers 个线程并发提交（每个线程复用 keep-alive 连接），priority 为 bulk，Idempotency-Key 为 task_id
+    4. 提交成功的占位在一次加锁读写中换成后端返回的 task_id
+    返回 {"success", "task_ids", "results": [每项结果，顺序与 items 一致], "message"}。
+    """
+    # reference_images 使用本模块的 Header 常量，在函数内导入避免循环导入
+    from reference_images import resolve_reference_urls
+
+    user_id = resolve_user_id(user_id)
+    results = []
+    jobs = []
+    for item in items or []:
+        try:
+            job = parse_item(item)
+        except ValueError as e:
+            # 单项不合法只记入该项结果，不影响其他项
+            results.append({"success": False, "shot_id": item.get("shot_id") if isinstance(item, dict) else None,
+                            "message": str(e)})
+            continue
+        job["result"] = {key: job[key] for key in ("shot_id", "frame_index", "task_id") if key in job}
+        results.append(job["result"])
+        jobs.append(job)
+
+    try:
+        found = write_shot_operations(storyboard_path, [job["op"] for job in jobs])
+    except StoryboardLockTimeout as e:
+        return {"success": False, "task_ids": [], "results": results,
+                "message": f"storyboard 正被其他进程写入，请稍后重试: {e}"}
+
+    pending = []
+    for job, ok in zip(jobs, found):
+        if ok:
+            pending.append(job)
+        else:
+            job["result"].update(success=False, message=f"shot_id {job['shot_id']} not found")
+
+    base_url = resolve_base_url(backend_base_url)
+    if not base_url:
+        for job in pending:
+            job["result"].update(success=True, message=f"已写入 isloading 占位；未配置 BACKEND_BASE_URL，未调用{label}接口")
+    elif pending:
+        # 多个镜头共用的资产图、上一镜头的尾帧即下一镜头的首帧等，去重后只转换一次；按目标尺寸分组
+        urls_by_side = {}
+        for job in pending:
+            for url, max_side in job["references"]:
+                urls_by_side.setdefault(max_side, []).append(url)
+        resolved = {
+            max_side: resolve_reference_urls(
+                urls, base_url=base_url, user_id=user_id, max_workers=max_workers, max_side=max_side
+            )
+            for max_side, urls in urls_by_side.items()
+        }
+
+        def resolve(url: str, max_side: int) -> str:
+            return resolved.get(max_side, {}).get(url, url)
+
+        def submit(job: dict) -> dict:
+            payload = build_payload(job, resolve)
+            payload["priority"] = "bulk"
+            return post_json(base_url, api_path, payload, user_id=user_id, idempotency_key=job["task_id"])
+
+        submitted = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as pool:
+            for job, api_result in zip(pending, pool.map(submit, pending)):
+                if api_result.get("_error"):
+                    job["result"].update(success=False, message=f"占位已写入，但调用{label}接口失败: {api_result['_error']}")
+                else:
+                    job["result"].update(success=True, task_id=api_result.get("task_id") or job["task_id"])
+                    submitted.append(job)
+
+        error = record_backend_task_ids(
+            storyboard_path, [(job["shot_id"], job["task_id"], job["result"]["task_id"]) for job in submitted]
+        )
+        if error:
+            for job in submitted:
+                job["result"].update(
+                    success=False, message=f"{label}任务已提交，但占位 taskId 未能更新为后端 task_id: {error}"
+                )
+
+    ok = sum(1 for r in results if r.get("success"))
+    return {
+        "success": ok == len(results) and ok > 0,
+        "task_ids": [r["task_id"] for r in results if r.get("success")],
+        "results": results,
+        "message": f"已提交 {ok}/{len(results)} 个{label}任务，storyboard 已一次写入 isloading 占位并保存",
+    }
@@ -0,0 +1,20 @@
+"""
+Fold pending journal operations (<storyboard>.journal) back into the storyboard JSON.
+
+Run after a series of journaled edits (STORYBOARD_JOURNAL=1) so the Creez app sees them.
+"""
+
+import argparse
+import json
+
+from skill_utils import compact_journal
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compact storyboard journal into the main JSON')
+    parser.add_argument('storyboard', help='Path to storyboard JSON file')
+    parser.add_argument('--compact', action='store_true', help='Write JSON without indentation')
+    args = parser.parse_args()
+
+    count = compact_journal(args.storyboard, compact=args.compact)
+    print(json.dumps({'success': True, 'operations': count}, ensure_ascii=False))
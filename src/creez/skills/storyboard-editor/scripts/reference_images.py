@@ -0,0 +1,245 @@
+"""
+参考图/首尾帧的请求格式转换：storyboard 内存 file://，请求后端时需转为后端可用的引用。
+
+优先将本地图片以二进制上传到后端 /creez/references/upload，请求体中只带返回的 url；
+上传失败（或后端未部署该接口）时回退为 base64 data URL。
+
+转换结果缓存在本地磁盘（STORYBOARD_REFERENCE_CACHE_DIR，默认 ~/.cache/creez/references），
+按 文件路径 + mtime + size 作为 key：素材图未改动时再次提交只需一次 stat。
+后端返回的 url 按内容哈希存储、长期有效，可直接复用；缓存目录可随时删除。
+设置 STORYBOARD_REFERENCE_CACHE=0 关闭缓存。
+
+图片格式按文件头（magic bytes）识别，不依赖扩展名。传入 max_side 且装有 Pillow 时，长边超过目标模型
+有效分辨率（或体积超过 STORYBOARD_REFERENCE_PASSTHROUGH_BYTES）的图片会先缩小并重新编码为 JPEG
+（带透明通道时为 WEBP），结果更小才采用；未装 Pillow 时原图发送。STORYBOARD_REFERENCE_DOWNSCALE=0 关闭缩小。
+"""
+
+import io
+import os
+import json
+import base64
+import hashlib
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError, URLError
+
+from backend_http import USER_ID_HEADER
+
+REFERENCE_CACHE_DIR = os.environ.get("STORYBOARD_REFERENCE_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "creez", "references"
+)
+REFERENCE_CACHE_ENABLED = os.environ.get("STORYBOARD_REFERENCE_CACHE", "1").strip().lower() not in ("0", "false", "no")
+REFERENCE_DOWNSCALE_ENABLED = os.environ.get("STORYBOARD_REFERENCE_DOWNSCALE", "1").strip().lower() not in ("0", "false", "no")
+REFERENCE_ENCODE_QUALITY = int(os.environ.get("STORYBOARD_REFERENCE_QUALITY", "90"))
+# 未超出 max_side 且小于该体积的图片原样发送，不重新编码
+REFERENCE_PASSTHROUGH_BYTES = int(os.environ.get("STORYBOARD_REFERENCE_PASSTHROUGH_BYTES", str(1024 * 1024)))
+
+# 与 Creez_backend 一致：Seedance 以 720p 输出，首尾帧长边超过 1280 对画质无收益
+VIDEO_REFERENCE_MAX_SIDE = 1280
+# 与 Creez_backend 的生图输出尺寸一致（doubao_4_0_image_generator.RATIO_2_WIDTH_HEIGHT 的长边）
+_IMAGE_OUTPUT_LONG_SIDE = {
+    "1:1": 2048,
+    "3:4": 2304,
+    "4:3": 2304,
+    "16:9": 2560,
+    "9:16": 2560,
+    "2:3": 2496,
+    "3:2": 2496,
+    "21:9": 3024,
+}
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 可选：未安装时不缩小，原图发送
+    Image = None
+
+
+def file_url_to_path(file_url: str) -> str:
+    """file:///D:/a.png → D:/a.png；file:///home/a.png → /home/a.png"""
+    path = file_url.strip()
+    path = path[7:] if path.startswith("file:///") else path[5:]
+    return os.path.normpath(path)
+
+
+def _guess_mime(path: str) -> str:
+    mime, _ = mimetypes.guess_type(path)
+    return mime if mime and mime.startswith("image/") else "image/png"
+
+
+def sniff_image_mime(data: bytes):
+    """按文件头识别图片格式，返回 image/xxx；无法识别时返回 None"""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data.startswith(b"BM"):
+        return "image/bmp"
+    return None
+
+
+def image_reference_max_side(aspect_ratio: str) -> int:
+    """生图参考图的最大有效长边：与该宽高比的输出尺寸长边一致"""
+    return _IMAGE_OUTPUT_LONG_SIDE.get((aspect_ratio or "").strip(), 2048)
+
+
+def _downscale(raw: bytes, max_side: int):
+    """等比缩小到长边不超过 max_side 并重新编码，返回 (bytes, mime)；无需处理或失败时返回 None"""
+    if Image is None or not REFERENCE_DOWNSCALE_ENABLED or not max_side:
+        return None
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            if max(img.size) <= max_side and len(raw) <= REFERENCE_PASSTHROUGH_BYTES:
+                return None
+            img = ImageOps.exif_transpose(img)
+            width, height = img.size
+            scale = min(1.0, max_side / float(max(width, height)))
+            if scale < 1.0:
+                img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            out = io.BytesIO()
+            if has_alpha:
+                img.convert("RGBA").save(out, format="WEBP", quality=REFERENCE_ENCODE_QUALITY, method=4)
+                mime = "image/webp"
+            else:
+                img.convert("RGB").save(
+                    out, format="JPEG", quality=REFERENCE_ENCODE_QUALITY, optimize=True, progressive=True
+                )
+                mime = "image/jpeg"
+    except Exception:
+        return None
+    encoded = out.getvalue()
+    return (encoded, mime) if len(encoded) < len(raw) else None
+
+
+def read_reference_image(path: str, max_side: int = 0):
+    """读取本地参考图，返回 (bytes, mime)：按文件头识别格式，传入 max_side 时按需缩小重编码。读取失败抛 OSError"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    downscaled = _downscale(raw, max_side)
+    if downscaled:
+        return downscaled
+    return raw, sniff_image_mime(raw) or _guess_mime(path)
+
+
+def _cache_key(path: str, kind: str):
+    """路径 + mtime + size + 转换方式 → 缓存 key；文件不存在时返回 None"""
+    if not REFERENCE_CACHE_ENABLED:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    raw = f"{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}\0{kind}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_file(key: str) -> str:
+    return os.path.join(REFERENCE_CACHE_DIR, key[:2], key)
+
+
+def _cache_get(key) -> str:
+    if not key:
+        return ""
+    try:
+        with open(_cache_file(key), "r", encoding="ascii") as f:
+            return f.read()
+    except (OSError, ValueError):
+        return ""
+
+
+def _cache_put(key, value: str) -> None:
+    """写临时文件再 rename，并发进程不会读到半截内容；缓存写失败不影响调用方"""
+    if not key or not value:
+        return
+    target = _cache_file(key)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(tmp, "w", encoding="ascii") as f:
+            f.write(value)
+        os.replace(tmp, target)
+    except (OSError, ValueError):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _encode_kind(kind: str, max_side: int) -> str:
+    if Image is None or not REFERENCE_DOWNSCALE_ENABLED or not max_side:
+        return kind
+    return f"{kind} {max_side} q{REFERENCE_ENCODE_QUALITY}"
+
+
+def file_url_to_base64_data_url(file_url: str, max_side: int = 0) -> str:
+    """将 file:// 路径读成 base64，返回 data:image/xxx;base64,...；读取失败原样返回"""
+    if not file_url or not file_url.strip().startswith("file://"):
+        return file_url
+    path = file_url_to_path(file_url)
+    key = _cache_key(path, _encode_kind("data", max_side))
+    cached = _cache_get(key)
+    if cached:
+        return cached
+    try:
+        raw, mime = read_reference_image(path, max_side)
+    except OSError:
+        return file_url
+    b64 = base64.b64encode(raw).decode("ascii")
+    data_url = f"data:{mime};base64,{b64}"
+    _cache_put(key, data_url)
+    return data_url
+
+
+def upload_reference_file(base_url: str, file_url: str, user_id: str = "", max_side: int = 0) -> dict:
+    """将 file:// 图片以二进制 POST 到 /creez/references/upload，返回 {"reference_id", "url"} 或 {"_error": ...}"""
+    path = file_url_to_path(file_url)
+    try:
+        raw, mime = read_reference_image(path, max_side)
+    except OSError as e:
+        return {"_error": str(e)}
+    url = base_url.rstrip("/") + "/creez/references/upload"
+    req = Request(url, data=raw, method="POST")
+    req.add_header("Content-Type", mime)
+    if user_id and str(user_id).strip():
+        req.add_header(USER_ID_HEADER, str(user_id).strip())
+    try:
+        with urlopen(req, timeout=60) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except (HTTPError, URLError, ValueError) as e:
+        return {"_error": str(e)}
+
+
+def resolve_reference_url(file_url: str, base_url: str = "", user_id: str = "", max_side: int = 0) -> str:
+    """file:// 转为请求用 URL：配置了 base_url 时先上传拿远端 url，失败回退 base64；非 file:// 原样返回。
+    max_side 为目标模型的有效长边（见 image_reference_max_side / VIDEO_REFERENCE_MAX_SIDE），0 表示不缩小"""
+    if not file_url or not file_url.strip().startswith("file://"):
+        return file_url
+    if base_url:
+        key = _cache_key(file_url_to_path(file_url), _encode_kind("upload " + base_url.rstrip("/"), max_side))
+        cached = _cache_get(key)
+        if cached:
+            return cached
+        uploaded = upload_reference_file(base_url, file_url, user_id=user_id, max_side=max_side)
+        if uploaded.get("url"):
+            _cache_put(key, uploaded["url"])
+            return uploaded["url"]
+    return file_url_to_base64_data_url(file_url, max_side=max_side)
+
+
+def resolve_reference_urls(
+    file_urls, base_url: str = "", user_id: str = "", max_workers: int = 4, max_side: int = 0
+) -> dict:
+    """批量转换：去重后并发调用 resolve_reference_url，每张图只上传/编码一次，返回 {原 url: 请求用 url}"""
+    unique = sorted({u for u in file_urls if u and u.strip().startswith("file://")})
+    if not unique:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as pool:
+        urls = pool.map(
+            lambda u: resolve_reference_url(u, base_url=base_url, user_id=user_id, max_side=max_side), unique
+        )
+        return dict(zip(unique, urls))
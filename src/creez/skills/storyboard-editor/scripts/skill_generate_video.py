@@ -1,7 +1,7 @@
 """
 为 storyboard 中指定镜头发起视频生成任务，并写回 isloading 占位符。
 
-脚本职责：将 first_frame_image / last_frame_image 若为 file:// 转为 base64 →
+脚本职责：将 first_frame_image / last_frame_image 若为 file:// 上传为远端参考图（失败回退 base64）→
 调用后端异步生视频接口 → 写回 isloading 占位并保存 storyboard（storyboard 内仍存 file:// 以兼容既有数据）。
 """
 
@@ -10,53 +10,83 @@ import sys
 import json
 import argparse
 import time
-import base64
 from uuid import uuid4
-from urllib.request import Request, urlopen
-from urllib.error import HTTPError, URLError
 
 _script_dir = os.path.dirname(os.path.abspath(__file__))
 if _script_dir not in sys.path:
     sys.path.insert(0, _script_dir)
 
-from skill_utils import load_storyboard, save_storyboard, find_shot_by_id
+from skill_utils import StoryboardLockTimeout, write_shot_operations
+from backend_http import (
+    BATCH_MAX_WORKERS,
+    load_batch_items,
+    post_json,
+    record_backend_task_ids,
+    resolve_base_url,
+    resolve_user_id,
+    run_generation_batch,
+)
+from reference_images import VIDEO_REFERENCE_MAX_SIDE, resolve_reference_url
 
+# 与 Creez_backend 及前端 main.js 一致
+VIDEO_API_PATH = "/creez/videos/async_generations"
 
-def _file_url_to_base64_data_url(file_path: str) -> str:
-    """将 file:// 路径读成 base64，返回 data:image/xxx;base64,..."""
-    if not file_path or not file_path.strip().startswith("file://"):
-        return file_path
-    path = file_path.strip()
-    path = path[7:] if path.startswith("file:///") else path[5:]
-    path = os.path.normpath(path)
-    try:
-        with open(path, "rb") as f:
-            raw = f.read()
-    except OSError:
-        return file_path
-    b64 = base64.b64encode(raw).decode("ascii")
-    return f"data:image/png;base64,{b64}"
-
-
-# 与 Creez_backend 一致：后端从 Header 的 X-User-Id 获取 user_id（见 middleware/auth.require_user_id）
-USER_ID_HEADER = "X-User-Id"
-# 测试用默认值，未传 --user_id 且无环境变量时使用，保证本地/Agent 调用能通过后端校验
-DEFAULT_USER_ID = "cbaef461-ae6e-46d8-bd06-cb4b94d68349"
-
-
-def _call_async_video_api(base_url: str, payload: dict, user_id: str = "") -> dict:
-    """POST 到 /creez/videos/async_generations（与 Creez_backend 及前端 main.js 一致），返回 {"task_id": "..."} 或抛错。后端要求 X-User-Id 在 Header。"""
-    url = base_url.rstrip("/") + "/creez/videos/async_generations"
-    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    req = Request(url, data=body, method="POST")
-    req.add_header("Content-Type", "application/json")
-    if user_id and str(user_id).strip():
-        req.add_header(USER_ID_HEADER, str(user_id).strip())
-    try:
-        with urlopen(req, timeout=60) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except (HTTPError, URLError) as e:
-        return {"_error": str(e)}
+
+def _new_job(
+    shot_id: int,
+    prompt: str,
+    model: str,
+    aspect_ratio: str,
+    duration: int,
+    first_frame_image: str,
+    last_frame_image: str,
+    created_at: int,
+) -> dict:
+    """一个生视频任务：task_id、写入 isloading 占位的日志操作与需转换的首尾帧"""
+    task_id = str(uuid4())
+    last_frame_image = last_frame_image or ""
+    placeholder = {
+        "status": "isloading",
+        "taskId": task_id,
+        "created_at": created_at,
+        "parameters": {
+            "prompt": prompt,
+            "model": model,
+            "aspect_ratio": aspect_ratio,
+            "duration": duration,
+            "first_frame_image": first_frame_image,
+            "last_frame_image": last_frame_image,
+        },
+        "video_urls": [],
+    }
+    # 首尾帧长边超过视频输出分辨率的部分对画质无收益，先缩小再发送
+    references = [(first_frame_image, VIDEO_REFERENCE_MAX_SIDE)]
+    if last_frame_image:
+        references.append((last_frame_image, VIDEO_REFERENCE_MAX_SIDE))
+    return {
+        "shot_id": shot_id,
+        "task_id": task_id,
+        "prompt": prompt,
+        "model": model,
+        "aspect_ratio": aspect_ratio,
+        "duration": duration,
+        "op": {"op": "append_video_placeholder", "shot_id": shot_id, "placeholder": placeholder},
+        "references": references,
+    }
+
+
+def _payload(job: dict, resolve, project_id: str = "", chat_id: str = "") -> dict:
+    """请求体：file:// 转换后只带 url（user_id 由后端从 Header X-User-Id 读取，不放在 body）。
+    后端 CreateVideoRequest 读取 frames：frames[0]=首帧，frames[1]=尾帧"""
+    return {
+        "prompt": job["prompt"],
+        "model": job["model"],
+        "aspect_ratio": job["aspect_ratio"],
+        "duration": job["duration"],
+        "frames": [{"url": resolve(url, max_side)} for url, max_side in job["references"]],
+        "project_id": project_id or "creez",
+        "chat_id": chat_id or "",
+    }
 
 
 def run(
@@ -76,42 +106,26 @@ def run(
 ) -> dict:
     """
     为指定镜头发起生视频任务：调用后端异步接口，在 storyboard 中写入 isloading 占位并保存。
-    first_frame_image / last_frame_image 在 storyboard 中保持 file://；请求接口时 file:// 转为 base64。
+    first_frame_image / last_frame_image 在 storyboard 中保持 file://；请求接口时 file:// 上传换成远端 url（失败回退 base64）。
     user_id 未传时从环境变量 CREEZ_USER_ID 读取，再缺省则用 DEFAULT_USER_ID（测试用）。
     """
-    user_id = (user_id or "").strip() or os.environ.get("CREEZ_USER_ID", "").strip() or DEFAULT_USER_ID
-    storyboard = load_storyboard(storyboard_path)
-    scene_board = storyboard.get("scene_board", [])
-    shot = find_shot_by_id(scene_board, shot_id)
-    if not shot:
-        return {"success": False, "message": f"shot_id {shot_id} not found"}
-
+    user_id = resolve_user_id(user_id)
     if not (first_frame_image or "").strip():
         return {"success": False, "message": f"shot_id {shot_id} 无可用首帧图，请先生成首帧图"}
+    job = _new_job(
+        shot_id, prompt, model, aspect_ratio, duration, first_frame_image, last_frame_image, int(time.time() * 1000)
+    )
+    task_id = job["task_id"]
 
-    task_id = str(uuid4())
-    created_at = int(time.time() * 1000)
-
-    placeholder = {
-        "status": "isloading",
-        "taskId": task_id,
-        "created_at": created_at,
-        "parameters": {
-            "prompt": prompt,
-            "model": model,
-            "aspect_ratio": aspect_ratio,
-            "duration": duration,
-            "first_frame_image": first_frame_image,
-            "last_frame_image": last_frame_image or "",
-        },
-        "video_urls": [],
-    }
-
-    videos = shot.setdefault("videos", [])
-    videos.append(placeholder)
-    save_storyboard(storyboard, storyboard_path)
+    # 加锁写入占位：多个进程同时为不同镜头提交时不会互相覆盖；journal 模式下只追加一条操作，不重写整个文件
+    try:
+        found = write_shot_operations(storyboard_path, [job["op"]])[0]
+    except StoryboardLockTimeout as e:
+        return {"success": False, "message": f"storyboard 正被其他进程写入，请稍后重试: {e}"}
+    if not found:
+        return {"success": False, "message": f"shot_id {shot_id} not found"}
 
-    base_url = (backend_base_url or os.environ.get("BACKEND_BASE_URL", "")).strip()
+    base_url = resolve_base_url(backend_base_url)
     if not base_url:
         return {
             "success": True,
@@ -120,20 +134,12 @@ def run(
             "message": "已写入 isloading 占位并保存；未配置 BACKEND_BASE_URL，未调用生视频接口",
         }
 
-    # 请求体：file:// 转为 base64 供后端使用（user_id 由后端从 Header X-User-Id 读取，不放在 body）
-    first_for_api = _file_url_to_base64_data_url(first_frame_image) if first_frame_image else ""
-    last_for_api = _file_url_to_base64_data_url(last_frame_image) if last_frame_image else ""
-    payload = {
-        "prompt": prompt,
-        "model": model,
-        "aspect_ratio": aspect_ratio,
-        "duration": duration,
-        "first_frame_image": first_for_api,
-        "last_frame_image": last_for_api or None,
-        "project_id": project_id or "creez",
-        "chat_id": chat_id or "",
-    }
-    api_result = _call_async_video_api(base_url, payload, user_id=user_id)
+    def resolve(url: str, max_side: int) -> str:
+        return resolve_reference_url(url, base_url=base_url, user_id=user_id, max_side=max_side)
+
+    api_result = post_json(
+        base_url, VIDEO_API_PATH, _payload(job, resolve, project_id, chat_id), user_id=user_id, idempotency_key=task_id
+    )
     if api_result.get("_error"):
         return {
             "success": False,
@@ -142,32 +148,130 @@ def run(
             "message": f"storyboard 已保存，但调用生视频接口失败: {api_result['_error']}",
         }
 
+    backend_task_id = api_result.get("task_id") or task_id
+    error = record_backend_task_ids(storyboard_path, [(shot_id, task_id, backend_task_id)])
+    if error:
+        return {
+            "success": False,
+            "task_id": backend_task_id,
+            "shot_id": shot_id,
+            "message": f"已提交视频生成任务 task_id={backend_task_id}，但占位 taskId 未能更新为该 task_id: {error}",
+        }
+
     return {
         "success": True,
-        "task_id": api_result.get("task_id", task_id),
+        "task_id": backend_task_id,
         "shot_id": shot_id,
-        "message": f"已提交视频生成任务 task_id={task_id}，storyboard 已写入 isloading 占位并保存",
+        "message": f"已提交视频生成任务 task_id={backend_task_id}，storyboard 已写入 isloading 占位并保存",
     }
 
 
+def _batch_job(item, created_at: int) -> dict:
+    """校验并规范化一个批量项，不合法时抛 ValueError"""
+    if not isinstance(item, dict) or "shot_id" not in item:
+        raise ValueError(f"无效的批量项（需含 shot_id 与 prompt）: {item}")
+    prompt = item.get("prompt")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise ValueError(f"shot_id {item['shot_id']} 缺少 prompt")
+    try:
+        shot_id = int(item["shot_id"])
+        duration = int(item.get("duration") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"shot_id / duration 需为整数: {item.get('shot_id')!r} / {item.get('duration')!r}")
+    first_frame_image = item.get("first_frame_image")
+    if not isinstance(first_frame_image, str) or not first_frame_image.strip():
+        raise ValueError(f"shot_id {shot_id} 无可用首帧图，请先生成首帧图")
+    last_frame_image = item.get("last_frame_image") or ""
+    if not isinstance(last_frame_image, str):
+        raise ValueError(f"shot_id {shot_id} 的 last_frame_image 需为字符串")
+    return _new_job(
+        shot_id,
+        prompt,
+        item.get("model", ""),
+        item.get("aspect_ratio", ""),
+        duration,
+        first_frame_image,
+        last_frame_image,
+        created_at,
+    )
+
+
+def run_batch(
+    storyboard_path: str,
+    items: list,
+    user_id: str = "",
+    project_id: str = "",
+    chat_id: str = "",
+    backend_base_url: str = "",
+    max_workers: int = BATCH_MAX_WORKERS,
+) -> dict:
+    """
+    一次为多个镜头发起生视频任务。items 每项为
+    {"shot_id", "prompt", "model", "aspect_ratio", "duration", "first_frame_image", "last_frame_image"(可选)}。
+    所有 videos 占位在一次加锁读写中写入 storyboard（只保存一次）；相邻镜头共用的首尾帧去重后只上传/编码一次；
+    接口请求用 max_workers 个线程并发提交（每个线程复用 keep-alive 连接），priority 为 bulk。
+    返回 {"success", "task_ids", "results": [每项结果，顺序与 items 一致], "message"}。
+    """
+    created_at = int(time.time() * 1000)
+    return run_generation_batch(
+        storyboard_path,
+        items,
+        parse_item=lambda item: _batch_job(item, created_at),
+        build_payload=lambda job, resolve: _payload(job, resolve, project_id, chat_id),
+        api_path=VIDEO_API_PATH,
+        label="生视频",
+        user_id=user_id,
+        backend_base_url=backend_base_url,
+        max_workers=max_workers,
+    )
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="为指定镜头发起视频生成任务并写回 isloading 占位。所有生视频参数需由调用方传入。"
     )
     parser.add_argument("storyboard", help="storyboard JSON 文件路径")
-    parser.add_argument("--shot_id", type=int, required=True, help="镜头 shot_id")
-    parser.add_argument("--prompt", required=True, help="视频 prompt")
-    parser.add_argument("--model", required=True, help="视频模型")
-    parser.add_argument("--aspect_ratio", required=True, help="宽高比，如 16:9")
-    parser.add_argument("--duration", type=int, required=True, help="视频时长（秒）")
-    parser.add_argument("--first_frame_image", required=True, help="首帧图 URL（支持 file://）")
+    parser.add_argument("--shot_id", type=int, help="镜头 shot_id（单个模式必填）")
+    parser.add_argument("--prompt", help="视频 prompt（单个模式必填）")
+    parser.add_argument("--model", help="视频模型（单个模式必填）")
+    parser.add_argument("--aspect_ratio", help="宽高比，如 16:9（单个模式必填）")
+    parser.add_argument("--duration", type=int, help="视频时长（秒）（单个模式必填）")
+    parser.add_argument("--first_frame_image", help="首帧图 URL（支持 file://）（单个模式必填）")
     parser.add_argument("--last_frame_image", default="", help="尾帧图 URL（可选，支持 file://）")
     parser.add_argument("--user_id", default="", help="系统级参数")
     parser.add_argument("--project_id", default="", help="系统级参数")
     parser.add_argument("--chat_id", default="", help="系统级参数")
     parser.add_argument("--backend_base_url", default="", help="后端 base URL，也可用环境变量 BACKEND_BASE_URL")
+    parser.add_argument(
+        "--batch",
+        help="批量模式：JSON 数组（或 JSON 文件路径），每项 {shot_id, prompt, model, aspect_ratio, duration, first_frame_image, last_frame_image}",
+    )
+    parser.add_argument("--max_workers", type=int, default=BATCH_MAX_WORKERS, help="批量模式并发请求数")
     args = parser.parse_args()
 
+    if args.batch:
+        try:
+            items = load_batch_items(args.batch)
+        except ValueError:
+            print(json.dumps({"success": False, "message": "batch 格式错误，需为 JSON 数组或其文件路径"}, ensure_ascii=False))
+            sys.exit(1)
+        result = run_batch(
+            args.storyboard,
+            items,
+            user_id=args.user_id,
+            project_id=args.project_id,
+            chat_id=args.chat_id,
+            backend_base_url=args.backend_base_url or os.environ.get("BACKEND_BASE_URL", ""),
+            max_workers=args.max_workers,
+        )
+        print(json.dumps(result, ensure_ascii=False))
+        sys.exit(0)
+
+    missing = [name for name in ("shot_id", "prompt", "model", "aspect_ratio", "duration", "first_frame_image")
+               if getattr(args, name) is None]
+    if missing:
+        parser.error("单个模式缺少参数: " + ", ".join("--" + m for m in missing))
+
     result = run(
         args.storyboard,
         shot_id=args.shot_id,
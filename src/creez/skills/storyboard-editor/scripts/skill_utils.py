@@ -2,21 +2,670 @@
 Utility functions for storyboard editing operations.
 """
 
+import hashlib
 import json
+import os
+import tempfile
+import threading
+import time
 import uuid
-from typing import Dict, List, Any, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used when missing
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class Storyboard:
+    """
+    Wraps a loaded storyboard dict and keeps lookup indexes for shots
+    (shot_id, scene_index) and assets (id, legacy file_id).
+
+    Lookups are O(1). Indexes stay consistent as long as shots/assets are
+    inserted, moved and deleted through this class; after editing
+    ``scene_board`` / ``asset`` lists directly, call ``reindex()``.
+    ``data`` is the original dict, so ``save_storyboard(sb.data, path)`` works.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.scene_board: List[Dict] = data.setdefault('scene_board', [])
+        self.art_materials: Dict = data.setdefault('art_materials', {})
+        self.assets: List[Dict] = self.art_materials.setdefault('asset', [])
+        self.reindex()
+
+    @classmethod
+    def load(cls, filepath: str, consume_journal: bool = True) -> 'Storyboard':
+        return cls(load_storyboard(filepath, consume_journal=consume_journal))
+
+    def save(self, filepath: str, compact: bool = False) -> bool:
+        return save_storyboard(self.data, filepath, compact=compact)
+
+    # ---- indexes ----
+
+    def reindex(self) -> None:
+        """Rebuild all indexes from the underlying lists."""
+        self._shots_by_id: Dict[Any, Dict] = {}
+        self._shots_by_index: Dict[Any, Dict] = {}
+        for shot in self.scene_board:
+            self._index_shot(shot)
+        self._max_shot_id = max((s.get('shot_id', 0) for s in self.scene_board), default=0)
+        self._assets_by_id: Dict[str, Dict] = {}
+        for asset in self.assets:
+            self._index_asset(asset)
+
+    def _index_shot(self, shot: Dict) -> None:
+        # First occurrence wins, matching the previous linear-scan helpers
+        self._shots_by_id.setdefault(shot.get('shot_id'), shot)
+        self._shots_by_index.setdefault(shot.get('scene_index'), shot)
+
+    def _index_asset(self, asset: Dict) -> None:
+        for key in (asset.get('id'), asset.get('file_id')):
+            if key:
+                self._assets_by_id.setdefault(key, asset)
+
+    def _renumber_from(self, start: int) -> None:
+        """Rewrite scene_index for shots at positions >= start and refresh the scene_index index."""
+        for idx in range(start, len(self.scene_board)):
+            shot = self.scene_board[idx]
+            old = shot.get('scene_index')
+            if self._shots_by_index.get(old) is shot:
+                del self._shots_by_index[old]
+            shot['scene_index'] = idx
+        for idx in range(start, len(self.scene_board)):
+            self._shots_by_index[idx] = self.scene_board[idx]
+
+    def _position_of(self, shot: Dict) -> int:
+        idx = shot.get('scene_index')
+        if isinstance(idx, int) and 0 <= idx < len(self.scene_board) and self.scene_board[idx] is shot:
+            return idx
+        for i, s in enumerate(self.scene_board):
+            if s is shot:
+                return i
+        raise ValueError('shot is not part of this storyboard')
+
+    # ---- shots ----
+
+    def shot(self, shot_id: int) -> Optional[Dict]:
+        return self._shots_by_id.get(shot_id)
+
+    def shot_at(self, scene_index: int) -> Optional[Dict]:
+        return self._shots_by_index.get(scene_index)
+
+    def next_shot_id(self) -> int:
+        return self._max_shot_id + 1
+
+    def insert_shot(self, shot: Dict, position: Optional[int] = None) -> Dict:
+        """Insert a shot (clamped to [0, len]) and renumber scene_index from there."""
+        if position is None or position > len(self.scene_board):
+            position = len(self.scene_board)
+        position = max(0, position)
+        self.scene_board.insert(position, shot)
+        self._shots_by_id.setdefault(shot.get('shot_id'), shot)
+        self._max_shot_id = max(self._max_shot_id, shot.get('shot_id', 0))
+        self._renumber_from(position)
+        return shot
+
+    def move_shot(self, shot_id: int, new_position: int) -> Dict:
+        shot = self.shot(shot_id)
+        if shot is None:
+            raise KeyError(f'shot_id {shot_id} not found')
+        old_position = self._position_of(shot)
+        new_position = max(0, min(new_position, len(self.scene_board) - 1))
+        self.scene_board.pop(old_position)
+        self.scene_board.insert(new_position, shot)
+        self._renumber_from(min(old_position, new_position))
+        return shot
+
+    def delete_shot(self, shot_id: int) -> Dict:
+        shot = self.shot(shot_id)
+        if shot is None:
+            raise KeyError(f'shot_id {shot_id} not found')
+        position = self._position_of(shot)
+        self.scene_board.pop(position)
+        if self._shots_by_index.get(shot.get('scene_index')) is shot:
+            del self._shots_by_index[shot.get('scene_index')]
+        # The old last position is now past the end
+        self._shots_by_index.pop(len(self.scene_board), None)
+        del self._shots_by_id[shot_id]
+        # Another shot may share the id (invalid but tolerated); keep the first remaining one indexed
+        duplicate = next((s for s in self.scene_board if s.get('shot_id') == shot_id), None)
+        if duplicate is not None:
+            self._shots_by_id[shot_id] = duplicate
+        if shot_id == self._max_shot_id:
+            self._max_shot_id = max((s.get('shot_id', 0) for s in self.scene_board), default=0)
+        self._renumber_from(position)
+        return shot
+
+    # ---- assets ----
+
+    def asset(self, asset_id: str) -> Optional[Dict]:
+        return self._assets_by_id.get(asset_id)
+
+    def assets_by_ids(self, asset_ids: List[str]) -> List[Dict]:
+        found = []
+        for aid in asset_ids:
+            asset = self._assets_by_id.get(aid)
+            if asset:
+                found.append(asset)
+        return found
+
+    def add_asset(self, asset: Dict) -> Dict:
+        self.assets.append(asset)
+        self._index_asset(asset)
+        return asset
+
+    def delete_asset(self, asset_id: str, remove_references: bool = True) -> Optional[Dict]:
+        """Remove an asset (by id or file_id); optionally strip references from all shots."""
+        asset = self.asset(asset_id)
+        if asset is None:
+            return None
+        self.assets.remove(asset)
+        for key in (asset.get('id'), asset.get('file_id')):
+            if key and self._assets_by_id.get(key) is asset:
+                del self._assets_by_id[key]
+        # Another asset may share the id / file_id; let it take over the index
+        for other in self.assets:
+            if asset_id in (other.get('id'), other.get('file_id')):
+                self._index_asset(other)
+        if remove_references:
+            remove_asset_references(self.scene_board, asset.get('id') or asset_id)
+        return asset
+
+
+# Last known content digest per file: abs path -> (sha256, mtime_ns, size).
+# Lets save_storyboard skip rewriting a file whose content would not change.
+_file_digests: Dict[str, Tuple[str, int, int]] = {}
+_file_digests_lock = threading.Lock()
+# Journal bytes already folded into the dict returned by load_storyboard: abs path -> offset
+_journal_consumed: Dict[str, int] = {}
+
+
+def _remember_digest(filepath: str, digest: str) -> None:
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return
+    with _file_digests_lock:
+        _file_digests[os.path.abspath(filepath)] = (digest, st.st_mtime_ns, st.st_size)
+
+
+def _current_digest(filepath: str) -> Optional[str]:
+    """Digest of the file on disk; uses the cached value when mtime/size are unchanged."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    with _file_digests_lock:
+        cached = _file_digests.get(os.path.abspath(filepath))
+    if cached and cached[1] == st.st_mtime_ns and cached[2] == st.st_size:
+        return cached[0]
+    return None
+
+
+def dumps_storyboard(storyboard: Dict[str, Any], compact: bool = False) -> bytes:
+    """Serialize to UTF-8 bytes: 4-space indent by default (the existing on-disk layout, so saving an
+    unchanged board rewrites nothing), no whitespace when compact. orjson, when installed, is used
+    for compact output only since it has no 4-space indent option."""
+    if compact:
+        if orjson is not None:
+            return orjson.dumps(storyboard)
+        return json.dumps(storyboard, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(storyboard, ensure_ascii=False, indent=4).encode('utf-8')
+
+
+def _read_storyboard_file(filepath: str) -> Dict[str, Any]:
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    _remember_digest(filepath, hashlib.sha256(raw).hexdigest())
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+
+def load_storyboard(filepath: str, apply_journal: bool = True, consume_journal: bool = True) -> Dict[str, Any]:
+    """Load storyboard JSON file, replaying pending journal operations (see append_operation).
+    The replayed bytes are dropped from the journal by the next save_storyboard; callers that only
+    read the board (and may append operations instead of saving) pass consume_journal=False."""
+    storyboard = _read_storyboard_file(filepath)
+    if apply_journal:
+        ops, consumed = read_journal(filepath)
+        if ops:
+            apply_operations(storyboard, ops)
+        if consume_journal:
+            with _file_digests_lock:
+                _journal_consumed[os.path.abspath(filepath)] = consumed
+    return storyboard
+
+
+def atomic_write_bytes(filepath: str, data: bytes) -> None:
+    """Write via a temp file in the same directory, fsync, then rename over the target.
+    Readers see either the old or the new file, never a partial one."""
+    directory = os.path.dirname(os.path.abspath(filepath))
+    try:
+        mode = os.stat(filepath).st_mode & 0o777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(filepath) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # Persist the rename itself (POSIX only)
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def save_storyboard(storyboard: Dict[str, Any], filepath: str, compact: bool = False) -> bool:
+    """Save storyboard to JSON atomically (temp file + fsync + rename).
+    Skips the write when the file already holds identical content.
+    Returns True if the file was written."""
+    data = dumps_storyboard(storyboard, compact=compact)
+    digest = hashlib.sha256(data).hexdigest()
+    written = False
+    if _current_digest(filepath) != digest:
+        atomic_write_bytes(filepath, data)
+        _remember_digest(filepath, digest)
+        written = True
+    # Journal operations replayed by load_storyboard are now part of the main file
+    with _file_digests_lock:
+        consumed = _journal_consumed.pop(os.path.abspath(filepath), 0)
+    if consumed:
+        _drop_journal_prefix(filepath, consumed)
+    return written
+
+
+# ---- cross-process locking ----
+#
+# Several scripts may edit the same board at once (e.g. parallel generation submissions).
+# Read-modify-write goes through storyboard_transaction(), which holds an advisory lock on
+# <board>.lock (not the board itself: atomic saves replace the board's inode).
+
+LOCK_SUFFIX = '.lock'
+DEFAULT_LOCK_TIMEOUT = float(os.environ.get('STORYBOARD_LOCK_TIMEOUT', '30'))
+
+# Locks held by this thread: abs path -> depth (the lock is reentrant within a thread)
+_held_locks = threading.local()
+
+
+class StoryboardLockTimeout(TimeoutError):
+    """Raised when the storyboard lock cannot be acquired within the timeout."""
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def storyboard_lock(filepath: str, timeout: Optional[float] = None, poll_interval: float = 0.05) -> Iterator[None]:
+    """Exclusive advisory lock for a storyboard across processes; raises StoryboardLockTimeout."""
+    timeout = DEFAULT_LOCK_TIMEOUT if timeout is None else timeout
+    key = os.path.abspath(filepath)
+    held = getattr(_held_locks, 'depth', None)
+    if held is None:
+        held = _held_locks.depth = {}
+    if held.get(key):
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    fd = os.open(key + LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise StoryboardLockTimeout(f'could not lock {filepath} within {timeout}s')
+            time.sleep(poll_interval)
+        held[key] = 1
+        try:
+            yield
+        finally:
+            held.pop(key, None)
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def storyboard_transaction(
+    filepath: str, timeout: Optional[float] = None, compact: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """Locked load -> modify -> save. The board is saved only if the block exits without an error.
+
+        with storyboard_transaction(path) as storyboard:
+            find_shot_by_id(storyboard['scene_board'], 3)['type'] = '近景'
+    """
+    with storyboard_lock(filepath, timeout):
+        storyboard = load_storyboard(filepath)
+        yield storyboard
+        save_storyboard(storyboard, filepath, compact=compact)
+
+
+# ---- operation journal ----
+#
+# Instead of rewriting the whole board for every small edit, scripts may append a typed
+# operation to a JSONL sidecar (<board>.journal). load_storyboard replays pending operations;
+# save_storyboard / compact_journal fold them back into the main JSON. Every operation is
+# idempotent (keyed by shot_id / taskId), so replaying one that is already in the main file
+# is harmless. External readers (the Creez app) only see journaled edits after compaction.
+
+JOURNAL_SUFFIX = '.journal'
+# Cached shot_id set of board + journal, so journaled writes need not parse the whole board
+SHOT_IDS_SUFFIX = '.journal.shots'
+_SHOT_IDS_TAIL_BYTES = 64
+# Compact automatically once the journal grows past this many bytes
+JOURNAL_COMPACT_BYTES = int(os.environ.get('STORYBOARD_JOURNAL_COMPACT_BYTES', str(256 * 1024)))
+
+
+def journal_enabled() -> bool:
+    """Scripts journal their edits only when STORYBOARD_JOURNAL=1 (default: rewrite the board)."""
+    return os.environ.get('STORYBOARD_JOURNAL', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def journal_path(filepath: str) -> str:
+    return filepath + JOURNAL_SUFFIX
+
+
+def read_journal(filepath: str) -> Tuple[List[Dict[str, Any]], int]:
+    """Return (operations, bytes consumed). A torn trailing line from a crash is ignored."""
+    try:
+        with open(journal_path(filepath), 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return [], 0
+    ops = []
+    consumed = 0
+    for line in raw.splitlines(keepends=True):
+        if not line.endswith(b'\n'):
+            break
+        consumed += len(line)
+        if not line.strip():
+            continue
+        try:
+            ops.append(json.loads(line))
+        except ValueError:
+            continue
+    return ops, consumed
+
+
+def append_operation(filepath: str, op: Dict[str, Any], auto_compact: bool = True) -> None:
+    """Append one operation (dict with an "op" key) to the board's journal: O(1), fsync'ed."""
+    if op.get('op') not in JOURNAL_OPERATIONS:
+        raise ValueError(f"unknown journal operation: {op.get('op')}")
+    line = json.dumps(op, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+    with storyboard_lock(filepath), open(journal_path(filepath), 'a+b') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                # Terminate a torn line left by a crashed writer so this op stays parseable
+                line = b'\n' + line
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    if auto_compact and size >= JOURNAL_COMPACT_BYTES:
+        compact_journal(filepath)
+
+
+def _board_stat(filepath: str) -> List[int]:
+    st = os.stat(filepath)
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+def _scan_journal_shot_ids(raw: bytes, shot_ids: set) -> int:
+    """Apply add_shot / delete_shot from complete journal lines in raw to shot_ids; returns bytes consumed."""
+    consumed = 0
+    for line in raw.splitlines(keepends=True):
+        if not line.endswith(b'\n'):
+            break
+        consumed += len(line)
+        if b'"add_shot"' not in line and b'"delete_shot"' not in line:
+            continue
+        try:
+            op = json.loads(line)
+        except ValueError:
+            continue
+        if op.get('op') == 'add_shot' and isinstance(op.get('shot'), dict):
+            shot_ids.add(op['shot'].get('shot_id'))
+        elif op.get('op') == 'delete_shot':
+            shot_ids.discard(op.get('shot_id'))
+    return consumed
+
+
+def _journal_tail(f, offset: int) -> str:
+    start = max(0, offset - _SHOT_IDS_TAIL_BYTES)
+    f.seek(start)
+    return f.read(offset - start).hex()
+
+
+def journal_shot_ids(filepath: str) -> set:
+    """shot_ids of the board with its journal replayed; call under storyboard_lock.
+
+    The set is cached in <board>.journal.shots with the board's stat and the journal offset it
+    covers, so a call only reads the journal bytes appended since. The board is parsed again only
+    when it or the journal was rewritten (save, compaction)."""
+    board = _board_stat(filepath)
+    cache_path = filepath + SHOT_IDS_SUFFIX
+    try:
+        with open(cache_path, 'rb') as f:
+            cache = json.loads(f.read())
+    except (OSError, ValueError):
+        cache = {}
+    try:
+        jf = open(journal_path(filepath), 'rb')
+    except FileNotFoundError:
+        jf = None
+    try:
+        journal_ino = os.fstat(jf.fileno()).st_ino if jf else 0
+        offset = cache.get('offset', 0) if isinstance(cache, dict) else 0
+        # Usable only if the board is unchanged and the journal was only appended to since
+        # (same inode, same bytes just before the cached offset)
+        valid = isinstance(cache, dict) and cache.get('board') == board and (
+            offset == 0 if jf is None
+            else cache.get('journal_ino') == journal_ino and _journal_tail(jf, offset) == cache.get('tail')
+        )
+        if valid:
+            shot_ids = set(cache.get('shot_ids', []))
+        else:
+            offset = 0
+            shot_ids = {shot.get('shot_id') for shot in _read_storyboard_file(filepath).get('scene_board', [])
+                        if isinstance(shot, dict)}
+        new_offset, tail = 0, ''
+        if jf is not None:
+            jf.seek(offset)
+            new_offset = offset + _scan_journal_shot_ids(jf.read(), shot_ids)
+            tail = _journal_tail(jf, new_offset)
+    finally:
+        if jf is not None:
+            jf.close()
+    if not valid or new_offset != offset:
+        data = {'board': board, 'journal_ino': journal_ino, 'offset': new_offset, 'tail': tail,
+                'shot_ids': list(shot_ids)}
+        atomic_write_bytes(cache_path, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    return shot_ids
+
+
+def write_shot_operations(filepath: str, ops: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[bool]:
+    """Write shot-targeted operations (each with a "shot_id") in one locked pass: appended to the
+    journal when journal_enabled() (shot existence comes from journal_shot_ids, without parsing the
+    board), otherwise applied to the board and saved once.
+    Returns, per operation, whether its shot exists (operations for missing shots are skipped)."""
+    if journal_enabled():
+        with storyboard_lock(filepath, timeout):
+            shot_ids = journal_shot_ids(filepath)
+            found = [op['shot_id'] in shot_ids for op in ops]
+            for op, ok in zip(ops, found):
+                if ok:
+                    append_operation(filepath, op)
+        return found
+    with storyboard_transaction(filepath, timeout) as storyboard:
+        sb = Storyboard(storyboard)
+        found = [sb.shot(op['shot_id']) is not None for op in ops]
+        apply_operations(sb, [op for op, ok in zip(ops, found) if ok])
+    return found
+
+
+def compact_journal(filepath: str, compact: bool = False) -> int:
+    """Fold pending journal operations into the main JSON. Returns the number of operations."""
+    with storyboard_lock(filepath):
+        ops, _ = read_journal(filepath)
+        if not ops:
+            return 0
+        storyboard = load_storyboard(filepath)
+        save_storyboard(storyboard, filepath, compact=compact)
+    return len(ops)
+
+
+def _drop_journal_prefix(filepath: str, consumed: int) -> None:
+    """Remove the first `consumed` bytes of the journal, keeping operations appended since."""
+    path = journal_path(filepath)
+    # Under the lock so no append lands between reading the rest and replacing the file
+    with storyboard_lock(filepath):
+        try:
+            with open(path, 'rb') as f:
+                f.seek(consumed)
+                rest = f.read()
+        except FileNotFoundError:
+            return
+        if rest:
+            atomic_write_bytes(path, rest)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def append_frame_placeholder(shot: Dict, frame_index: int, placeholder: Dict) -> None:
+    """frame_index 0 appends a candidate to picture.frames[0]; >= 1 starts a new frame group."""
+    frames = shot.setdefault('picture', {}).setdefault('frames', [])
+    if frame_index == 0:
+        if not frames:
+            frames.append([])
+        frames[0].append(placeholder)
+    else:
+        frames.append([placeholder])
+
+
+def append_video_placeholder(shot: Dict, placeholder: Dict) -> None:
+    shot.setdefault('videos', []).append(placeholder)
+
+
+def _has_task(items, task_id) -> bool:
+    return bool(task_id) and any(isinstance(i, dict) and i.get('taskId') == task_id for i in items)
+
+
+def iter_frame_candidates(shot: Dict):
+    """Yield every image candidate dict across all picture.frames groups of a shot."""
+    for group in shot.get('picture', {}).get('frames', []):
+        if isinstance(group, list):
+            for candidate in group:
+                if isinstance(candidate, dict):
+                    yield candidate
+
+
+def _op_add_shot(sb: Storyboard, op: Dict) -> None:
+    shot = op['shot']
+    if sb.shot(shot.get('shot_id')) is None:
+        sb.insert_shot(shot, op.get('position'))
+
+
+def _op_delete_shot(sb: Storyboard, op: Dict) -> None:
+    if sb.shot(op['shot_id']) is not None:
+        sb.delete_shot(op['shot_id'])
+
+
+def _op_update_shot(sb: Storyboard, op: Dict) -> None:
+    shot = sb.shot(op['shot_id'])
+    if shot is not None:
+        shot.update(op.get('fields', {}))
+
+
+def _op_append_frame_placeholder(sb: Storyboard, op: Dict) -> None:
+    shot = sb.shot(op['shot_id'])
+    placeholder = op['placeholder']
+    if shot is not None and not _has_task(iter_frame_candidates(shot), placeholder.get('taskId')):
+        append_frame_placeholder(shot, op.get('frame_index', 0), placeholder)
+
+
+def _op_append_video_placeholder(sb: Storyboard, op: Dict) -> None:
+    shot = sb.shot(op['shot_id'])
+    placeholder = op['placeholder']
+    if shot is not None and not _has_task(shot.get('videos', []), placeholder.get('taskId')):
+        append_video_placeholder(shot, placeholder)
+
+
+def _op_update_task_status(sb: Storyboard, op: Dict) -> None:
+    """Update the frame candidate / video entry whose taskId matches (fields e.g. status, image_urls)."""
+    task_id = op['task_id']
+    shots = [sb.shot(op['shot_id'])] if op.get('shot_id') is not None else sb.scene_board
+    for shot in shots:
+        if shot is None:
+            continue
+        for item in list(iter_frame_candidates(shot)) + list(shot.get('videos', [])):
+            if isinstance(item, dict) and item.get('taskId') == task_id:
+                item.update(op.get('fields', {}))
+                return
 
 
-def load_storyboard(filepath: str) -> Dict[str, Any]:
-    """Load storyboard JSON file."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+JOURNAL_OPERATIONS = {
+    'add_shot': _op_add_shot,
+    'delete_shot': _op_delete_shot,
+    'update_shot': _op_update_shot,
+    'append_frame_placeholder': _op_append_frame_placeholder,
+    'append_video_placeholder': _op_append_video_placeholder,
+    'update_task_status': _op_update_task_status,
+}
 
 
-def save_storyboard(storyboard: Dict[str, Any], filepath: str) -> None:
-    """Save storyboard to JSON file with proper formatting."""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(storyboard, f, ensure_ascii=False, indent=4)
+def apply_operations(storyboard: Union[Dict[str, Any], Storyboard], ops: List[Dict[str, Any]]) -> None:
+    sb = storyboard if isinstance(storyboard, Storyboard) else Storyboard(storyboard)
+    for op in ops:
+        handler = JOURNAL_OPERATIONS.get(op.get('op'))
+        if handler is not None:
+            handler(sb, op)
 
 
 def update_scene_indices(scene_board: List[Dict]) -> None:
@@ -25,8 +674,10 @@ def update_scene_indices(scene_board: List[Dict]) -> None:
         shot['scene_index'] = idx
 
 
-def get_next_shot_id(scene_board: List[Dict]) -> int:
+def get_next_shot_id(scene_board: Union[List[Dict], Storyboard]) -> int:
     """Get the next available shot_id."""
+    if isinstance(scene_board, Storyboard):
+        return scene_board.next_shot_id()
     if not scene_board:
         return 1
     return max(shot.get('shot_id', 0) for shot in scene_board) + 1
@@ -44,38 +695,41 @@ def generate_asset_id() -> str:
     return f"asset_{t}_{short}"
 
 
-def find_shot_by_id(scene_board: List[Dict], shot_id: int) -> Optional[Dict]:
-    """Find a shot by its shot_id."""
+def find_shot_by_id(scene_board: Union[List[Dict], Storyboard], shot_id: int) -> Optional[Dict]:
+    """Find a shot by its shot_id (O(1) when given a Storyboard)."""
+    if isinstance(scene_board, Storyboard):
+        return scene_board.shot(shot_id)
     for shot in scene_board:
         if shot.get('shot_id') == shot_id:
             return shot
     return None
 
 
-def find_shot_by_index(scene_board: List[Dict], scene_index: int) -> Optional[Dict]:
-    """Find a shot by its scene_index."""
+def find_shot_by_index(scene_board: Union[List[Dict], Storyboard], scene_index: int) -> Optional[Dict]:
+    """Find a shot by its scene_index (O(1) when given a Storyboard)."""
+    if isinstance(scene_board, Storyboard):
+        return scene_board.shot_at(scene_index)
     for shot in scene_board:
         if shot.get('scene_index') == scene_index:
             return shot
     return None
 
 
-def find_asset_by_id(art_materials: Dict, asset_id: str) -> Optional[Dict]:
-    """Find an asset by its id (or legacy file_id)."""
+def find_asset_by_id(art_materials: Union[Dict, Storyboard], asset_id: str) -> Optional[Dict]:
+    """Find an asset by its id (or legacy file_id); O(1) when given a Storyboard."""
+    if isinstance(art_materials, Storyboard):
+        return art_materials.asset(asset_id)
     for asset in art_materials.get('asset', []):
         if asset.get('id') == asset_id or asset.get('file_id') == asset_id:
             return asset
     return None
 
 
-def get_assets_by_ids(art_materials: Dict, asset_ids: List[str]) -> List[Dict]:
-    """Get multiple assets by their ids (or legacy file_ids)."""
-    assets = []
-    for aid in asset_ids:
-        asset = find_asset_by_id(art_materials, aid)
-        if asset:
-            assets.append(asset)
-    return assets
+def get_assets_by_ids(art_materials: Union[Dict, Storyboard], asset_ids: List[str]) -> List[Dict]:
+    """Get multiple assets by their ids (or legacy file_ids). Builds one index, so O(n + m)."""
+    if not isinstance(art_materials, Storyboard):
+        art_materials = Storyboard({'scene_board': [], 'art_materials': {'asset': art_materials.get('asset', [])}})
+    return art_materials.assets_by_ids(asset_ids)
 
 
 def create_shot_template(shot_id: int, scene_index: int) -> Dict[str, Any]:
@@ -0,0 +1,214 @@
+"""
+一次同步 storyboard 中所有 isloading 占位的生成结果。
+
+收集 picture.frames 与 videos 中所有 status 为 isloading 的 taskId，按批（--chunk_size）调用后端
+/creez/images/pollimages 与 /creez/videos/pollvideos，把已结束任务的 url / 状态在一次加锁读写中写回 storyboard。
+写回规则与 Creez 前端面板的轮询一致：completed 写入 image_urls / video_urls；failed、overtime 记为 failed 并写入 errorMessage；
+cancelled（用户取消）同样记为 failed，errorMessage 为“任务已取消”。
+--watch 时按 --interval 秒重复同步，直到没有 isloading 占位或超过 --timeout 秒。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.insert(0, _script_dir)
+
+from skill_utils import (
+    append_operation,
+    iter_frame_candidates,
+    journal_enabled,
+    load_storyboard,
+    storyboard_lock,
+    storyboard_transaction,
+    StoryboardLockTimeout,
+)
+from backend_http import post_json, resolve_base_url, resolve_user_id
+
+POLL_CHUNK_SIZE = 100
+DONE_STATUSES = ("completed", "failed", "overtime", "cancelled")
+
+# 任务类型 -> (轮询接口, 结果 url 字段)
+_KINDS = {
+    "image": ("/creez/images/pollimages", "image_urls"),
+    "video": ("/creez/videos/pollvideos", "video_urls"),
+}
+
+
+def _pending_items(storyboard: dict):
+    """遍历所有 isloading 占位，产出 (kind, shot, item)"""
+    for shot in storyboard.get("scene_board", []):
+        if not isinstance(shot, dict):
+            continue
+        for item in iter_frame_candidates(shot):
+            if item.get("status") == "isloading" and item.get("taskId"):
+                yield "image", shot, item
+        for item in shot.get("videos", []):
+            if isinstance(item, dict) and item.get("status") == "isloading" and item.get("taskId"):
+                yield "video", shot, item
+
+
+def collect_pending_tasks(storyboard: dict) -> dict:
+    """返回 {"image": [taskId, ...], "video": [taskId, ...]}（去重，保持出现顺序）"""
+    pending = {kind: {} for kind in _KINDS}
+    for kind, _, item in _pending_items(storyboard):
+        pending[kind].setdefault(item["taskId"], None)
+    return {kind: list(ids) for kind, ids in pending.items()}
+
+
+def poll_tasks(base_url: str, kind: str, task_ids: list, user_id: str = "", chunk_size: int = POLL_CHUNK_SIZE) -> dict:
+    """分批轮询，返回 {taskId: 后端结果}；某一批失败时跳过该批（下次同步重试）"""
+    path = _KINDS[kind][0]
+    results = {}
+    errors = []
+    chunk_size = max(1, chunk_size)
+    for start in range(0, len(task_ids), chunk_size):
+        resp = post_json(base_url, path, {"task_ids": task_ids[start:start + chunk_size]}, user_id=user_id, retry=True)
+        if resp.get("_error"):
+            errors.append(resp["_error"])
+            continue
+        data = resp.get("data")
+        if isinstance(data, dict):
+            results.update(data)
+    if errors:
+        results["_errors"] = errors
+    return results
+
+
+def _result_fields(kind: str, result: dict) -> dict:
+    """后端结果 → 写回占位的字段；任务未结束时返回空 dict"""
+    status = result.get("status")
+    if status not in DONE_STATUSES:
+        return {}
+    url_field = _KINDS[kind][1]
+    urls = result.get(url_field)
+    if not isinstance(urls, list) or not urls:
+        single = result.get(url_field[:-1])
+        urls = [single] if single else []
+    fields = {"status": "completed" if status == "completed" else "failed", url_field: urls}
+    if kind == "video":
+        fields["video_url"] = urls[0] if urls else ""
+    if status == "cancelled":
+        fields["errorMessage"] = "任务已取消"
+    elif status != "completed":
+        fields["errorMessage"] = result.get("message") or "失败"
+    return fields
+
+
+def apply_task_results(storyboard: dict, results: dict) -> list:
+    """把 {"image": {taskId: 结果}, "video": {...}} 写回占位，返回写回的 [(shot_id, taskId, fields)]"""
+    updated = []
+    for kind, shot, item in list(_pending_items(storyboard)):
+        result = results.get(kind, {}).get(item["taskId"])
+        fields = _result_fields(kind, result) if isinstance(result, dict) else {}
+        if fields:
+            item.update(fields)
+            updated.append((shot.get("shot_id"), item["taskId"], fields))
+    return updated
+
+
+def sync_once(
+    storyboard_path: str,
+    user_id: str = "",
+    backend_base_url: str = "",
+    chunk_size: int = POLL_CHUNK_SIZE,
+) -> dict:
+    """同步一次：轮询所有 isloading 任务，已结束的一次写回 storyboard"""
+    user_id = resolve_user_id(user_id)
+    base_url = resolve_base_url(backend_base_url)
+    if not base_url:
+        return {"success": False, "message": "未配置 BACKEND_BASE_URL，无法轮询任务"}
+
+    # 只读：不标记日志已合并，避免之后的保存丢弃未重放的日志
+    pending = collect_pending_tasks(load_storyboard(storyboard_path, consume_journal=False))
+    total = sum(len(ids) for ids in pending.values())
+    if not total:
+        return {"success": True, "pending": 0, "updated": 0, "completed": 0, "failed": 0, "message": "没有 isloading 占位"}
+
+    # 轮询期间不持有锁，只在写回时加锁重新读取，期间其他脚本新写入的占位不会丢失
+    results = {kind: poll_tasks(base_url, kind, ids, user_id, chunk_size) for kind, ids in pending.items() if ids}
+    errors = [e for r in results.values() for e in r.pop("_errors", [])]
+
+    try:
+        if journal_enabled():
+            with storyboard_lock(storyboard_path):
+                # 只追加日志、不保存主文件，同样不标记日志已合并
+                updated = apply_task_results(load_storyboard(storyboard_path, consume_journal=False), results)
+                for shot_id, task_id, fields in updated:
+                    append_operation(storyboard_path, {
+                        "op": "update_task_status",
+                        "shot_id": shot_id,
+                        "task_id": task_id,
+                        "fields": fields,
+                    })
+        else:
+            with storyboard_transaction(storyboard_path) as storyboard:
+                updated = apply_task_results(storyboard, results)
+    except StoryboardLockTimeout as e:
+        return {"success": False, "pending": total, "message": f"storyboard 正被其他进程写入，请稍后重试: {e}"}
+
+    completed = sum(1 for _, _, fields in updated if fields["status"] == "completed")
+    result = {
+        "success": not errors,
+        "pending": total - len(updated),
+        "updated": len(updated),
+        "completed": completed,
+        "failed": len(updated) - completed,
+        "message": f"{total} 个进行中任务，本次写回 {len(updated)} 个（完成 {completed}，失败 {len(updated) - completed}）",
+    }
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def watch(
+    storyboard_path: str,
+    user_id: str = "",
+    backend_base_url: str = "",
+    chunk_size: int = POLL_CHUNK_SIZE,
+    interval: float = 5.0,
+    timeout: float = 1800.0,
+) -> dict:
+    """重复同步直到没有 isloading 占位或超时，返回累计结果"""
+    deadline = time.monotonic() + timeout
+    totals = {"updated": 0, "completed": 0, "failed": 0}
+    while True:
+        result = sync_once(storyboard_path, user_id, backend_base_url, chunk_size)
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        if "pending" not in result or result["pending"] == 0 or time.monotonic() + interval > deadline:
+            break
+        time.sleep(interval)
+    result.update(totals)
+    if result.get("pending"):
+        result["message"] = f"等待超时，仍有 {result['pending']} 个任务未结束；累计写回 {totals['updated']} 个"
+    elif "pending" in result:
+        result["message"] = f"全部任务已结束；累计写回 {totals['updated']} 个（完成 {totals['completed']}，失败 {totals['failed']}）"
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="同步 storyboard 中所有 isloading 占位的生成结果")
+    parser.add_argument("storyboard", help="storyboard JSON 文件路径")
+    parser.add_argument("--watch", action="store_true", help="持续同步直到所有任务结束")
+    parser.add_argument("--interval", type=float, default=5.0, help="--watch 时的轮询间隔（秒）")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="--watch 时的最长等待时间（秒）")
+    parser.add_argument("--chunk_size", type=int, default=POLL_CHUNK_SIZE, help="每次轮询请求携带的 task_id 数")
+    parser.add_argument("--user_id", default="", help="系统级参数")
+    parser.add_argument("--backend_base_url", default="", help="后端 base URL，也可用环境变量 BACKEND_BASE_URL")
+    args = parser.parse_args()
+
+    kwargs = dict(
+        user_id=args.user_id,
+        backend_base_url=args.backend_base_url or os.environ.get("BACKEND_BASE_URL", ""),
+        chunk_size=args.chunk_size,
+    )
+    if args.watch:
+        result = watch(args.storyboard, interval=args.interval, timeout=args.timeout, **kwargs)
+    else:
+        result = sync_once(args.storyboard, **kwargs)
+    print(json.dumps(result, ensure_ascii=False))
@@ -1,22 +1,38 @@
 """
 Validate storyboard JSON structure and data integrity.
+
+The document is walked once: the asset id index is built up front and shot ids and
+task ids are tracked in sets, so validation stays near-linear in shots + assets + frames
+and stays fast on boards with thousands of shots.
 """
 
-from typing import Dict, List, Tuple, Any
+import json
+from typing import Dict, List, Tuple, Any, Optional, Set
 from skill_utils import load_storyboard
 
+# Statuses written by the generation scripts, sync_tasks.py, the backend and the Creez renderer
+# (see renderer/modules/workspace/scene-board-ai-data.md)
+TASK_STATUSES = (
+    'isloading', 'processing', 'completed', 'failed', 'overtime', 'cancelled',
+    'waiting_backend', 'placeholder', 'draft',
+)
+
 
 class ValidationError:
-    def __init__(self, level: str, message: str, location: str = ""):
+    def __init__(self, level: str, message: str, location: str = "", code: str = ""):
         self.level = level  # "error", "warning", "info"
         self.message = message
         self.location = location
+        self.code = code  # stable machine-readable id, e.g. "duplicate_shot_id"
     
     def __str__(self):
         prefix = {"error": "❌", "warning": "⚠️", "info": "ℹ️"}[self.level]
         loc = f" [{self.location}]" if self.location else ""
         return f"{prefix} {self.message}{loc}"
 
+    def to_dict(self) -> Dict[str, str]:
+        return {"level": self.level, "code": self.code, "message": self.message, "location": self.location}
+
 
 def validate_storyboard(storyboard: Dict[str, Any]) -> Tuple[bool, List[ValidationError]]:
     """
@@ -26,21 +42,20 @@ def validate_storyboard(storyboard: Dict[str, Any]) -> Tuple[bool, List[Validati
     
     # Check root structure
     if 'scene_board' not in storyboard:
-        errors.append(ValidationError("error", "Missing 'scene_board' field", "root"))
+        errors.append(ValidationError("error", "Missing 'scene_board' field", "root", "missing_field"))
         return False, errors
     
     if 'art_materials' not in storyboard:
-        errors.append(ValidationError("error", "Missing 'art_materials' field", "root"))
+        errors.append(ValidationError("error", "Missing 'art_materials' field", "root", "missing_field"))
         return False, errors
     
     scene_board = storyboard['scene_board']
     art_materials = storyboard['art_materials']
     
-    # Validate scene_board
-    errors.extend(validate_scene_board(scene_board, art_materials))
-    
-    # Validate art_materials
-    errors.extend(validate_art_materials(art_materials))
+    # Validate art_materials first: it builds the asset id index the shots are checked against
+    asset_errors, asset_ids = _validate_assets(art_materials)
+    errors.extend(validate_scene_board(scene_board, art_materials, asset_ids))
+    errors.extend(asset_errors)
     
     # Check for errors vs warnings
     has_errors = any(e.level == "error" for e in errors)
@@ -48,77 +63,109 @@ def validate_storyboard(storyboard: Dict[str, Any]) -> Tuple[bool, List[Validati
     return not has_errors, errors
 
 
-def validate_scene_board(scene_board: List[Dict], art_materials: Dict) -> List[ValidationError]:
+def validate_storyboard_report(storyboard: Dict[str, Any]) -> Dict[str, Any]:
+    """Structured result: {"valid", "counts": {"error", "warning", "info"}, "issues": [...]}."""
+    is_valid, errors = validate_storyboard(storyboard)
+    counts = {"error": 0, "warning": 0, "info": 0}
+    for e in errors:
+        counts[e.level] += 1
+    return {"valid": is_valid, "counts": counts, "issues": [e.to_dict() for e in errors]}
+
+
+def collect_asset_ids(art_materials: Any) -> Set[str]:
+    """All ids a shot may reference: asset 'id' and legacy 'file_id'."""
+    asset_ids = set()
+    assets = art_materials.get('asset', []) if isinstance(art_materials, dict) else []
+    for a in assets if isinstance(assets, list) else []:
+        if isinstance(a, dict):
+            if a.get('id'):
+                asset_ids.add(a['id'])
+            if a.get('file_id'):
+                asset_ids.add(a['file_id'])
+    return asset_ids
+
+
+def validate_scene_board(
+    scene_board: List[Dict], art_materials: Dict, asset_ids: Optional[Set[str]] = None
+) -> List[ValidationError]:
     """Validate scene_board array."""
     errors = []
     
     if not isinstance(scene_board, list):
-        errors.append(ValidationError("error", "scene_board must be an array", "scene_board"))
+        errors.append(ValidationError("error", "scene_board must be an array", "scene_board", "invalid_type"))
         return errors
     
-    shot_ids = []
+    if asset_ids is None:
+        asset_ids = collect_asset_ids(art_materials)
+    shot_ids = set()
     scene_indices = []
+    task_ids = set()
     
     for idx, shot in enumerate(scene_board):
         location = f"scene_board[{idx}]"
+        if not isinstance(shot, dict):
+            errors.append(ValidationError("error", "Shot must be an object", location, "invalid_type"))
+            continue
         
         # Check required fields
         required_fields = ['shot_id', 'scene_index', 'picture']
         for field in required_fields:
             if field not in shot:
-                errors.append(ValidationError("error", f"Missing required field '{field}'", location))
+                errors.append(ValidationError("error", f"Missing required field '{field}'", location, "missing_field"))
         
         # Validate shot_id
         shot_id = shot.get('shot_id')
         if shot_id is not None:
             if not isinstance(shot_id, int):
-                errors.append(ValidationError("error", "shot_id must be an integer", location))
+                errors.append(ValidationError("error", "shot_id must be an integer", location, "invalid_type"))
             elif shot_id in shot_ids:
-                errors.append(ValidationError("error", f"Duplicate shot_id: {shot_id}", location))
+                errors.append(ValidationError("error", f"Duplicate shot_id: {shot_id}", location, "duplicate_shot_id"))
             else:
-                shot_ids.append(shot_id)
+                shot_ids.add(shot_id)
         
         # Validate scene_index
         scene_index = shot.get('scene_index')
         if scene_index is not None:
             if not isinstance(scene_index, int):
-                errors.append(ValidationError("error", "scene_index must be an integer", location))
+                errors.append(ValidationError("error", "scene_index must be an integer", location, "invalid_type"))
             else:
                 scene_indices.append(scene_index)
         
         # Validate duration
         duration = shot.get('duration')
         if duration is not None and not isinstance(duration, (int, float)):
-            errors.append(ValidationError("warning", "duration should be a number", location))
+            errors.append(ValidationError("warning", "duration should be a number", location, "invalid_type"))
         
         # Validate active_assets
         active_assets = shot.get('active_assets', [])
         if not isinstance(active_assets, list):
-            errors.append(ValidationError("error", "active_assets must be an array", location))
+            errors.append(ValidationError("error", "active_assets must be an array", location, "invalid_type"))
         else:
             # Check if referenced assets exist (id or legacy file_id)
-            asset_ids = set()
-            for a in art_materials.get('asset', []):
-                if a.get('id'):
-                    asset_ids.add(a['id'])
-                if a.get('file_id'):
-                    asset_ids.add(a['file_id'])
             for aid in active_assets:
-                if aid not in asset_ids:
+                if not isinstance(aid, str) or aid not in asset_ids:
                     errors.append(ValidationError("warning",
-                        f"Referenced asset '{aid}' not found in art_materials", location))
+                        f"Referenced asset '{aid}' not found in art_materials", location, "unknown_asset"))
 
         # Validate picture structure (frames is 2D array; first_frame is legacy)
         picture = shot.get('picture', {})
         if not isinstance(picture, dict):
-            errors.append(ValidationError("error", "picture must be an object", location))
+            errors.append(ValidationError("error", "picture must be an object", location, "invalid_type"))
+        elif 'frames' not in picture:
+            errors.append(ValidationError("warning", "picture missing 'frames'", location, "missing_field"))
         else:
-            if 'frames' not in picture:
-                errors.append(ValidationError("warning", "picture missing 'frames'", location))
+            _validate_frames(picture['frames'], f"{location}.picture.frames", task_ids, errors)
         
         # Validate videos/video field
         if 'videos' not in shot and 'video' not in shot:
-            errors.append(ValidationError("warning", "Shot missing 'videos' or 'video' field", location))
+            errors.append(ValidationError("warning", "Shot missing 'videos' or 'video' field", location, "missing_field"))
+        elif 'videos' in shot:
+            videos = shot['videos']
+            if not isinstance(videos, list):
+                errors.append(ValidationError("error", "videos must be an array", location, "invalid_type"))
+            else:
+                for vidx, item in enumerate(videos):
+                    _validate_task_item(item, 'video_urls', f"{location}.videos[{vidx}]", task_ids, errors)
     
     # Check scene_index sequence
     if scene_indices:
@@ -126,55 +173,107 @@ def validate_scene_board(scene_board: List[Dict], art_materials: Dict) -> List[V
         expected = list(range(len(scene_board)))
         if scene_indices != expected:
             errors.append(ValidationError("error", 
-                f"scene_index not sequential. Expected {expected}, got {scene_indices}", "scene_board"))
+                f"scene_index not sequential. Expected {expected}, got {scene_indices}", "scene_board",
+                "scene_index_sequence"))
     
     return errors
 
 
+def _validate_frames(frames: Any, location: str, task_ids: Set[str], errors: List[ValidationError]) -> None:
+    """picture.frames is a 2D array: frames[group][candidate], each candidate a generation record."""
+    if not isinstance(frames, list):
+        errors.append(ValidationError("error", "picture.frames must be a 2D array", location, "invalid_type"))
+        return
+    for gidx, group in enumerate(frames):
+        if not isinstance(group, list):
+            errors.append(ValidationError("error", "Frame group must be an array", f"{location}[{gidx}]", "invalid_type"))
+            continue
+        for cidx, item in enumerate(group):
+            _validate_task_item(item, 'image_urls', f"{location}[{gidx}][{cidx}]", task_ids, errors)
+
+
+def _validate_task_item(
+    item: Any, url_field: str, location: str, task_ids: Set[str], errors: List[ValidationError]
+) -> None:
+    """Check one image candidate / video record written by the generation scripts or the Creez panels."""
+    if not isinstance(item, dict):
+        errors.append(ValidationError("error", "Generation record must be an object", location, "invalid_type"))
+        return
+    status = item.get('status')
+    task_id = item.get('taskId')
+    if status is not None and status not in TASK_STATUSES:
+        errors.append(ValidationError("warning", f"Unknown status '{status}'", location, "unknown_status"))
+    if status == 'isloading' and not task_id:
+        errors.append(ValidationError("warning",
+            "isloading record has no taskId and can never be resolved", location, "orphan_placeholder"))
+    if task_id:
+        if task_id in task_ids:
+            errors.append(ValidationError("warning", f"Duplicate taskId: {task_id}", location, "duplicate_task_id"))
+        else:
+            task_ids.add(task_id)
+    urls = item.get(url_field)
+    if urls is not None and not isinstance(urls, list):
+        errors.append(ValidationError("warning", f"'{url_field}' must be an array", location, "invalid_type"))
+    elif status == 'completed' and not urls:
+        errors.append(ValidationError("warning", f"completed record has empty '{url_field}'", location, "missing_result"))
+
+
 def validate_art_materials(art_materials: Dict) -> List[ValidationError]:
     """Validate art_materials object."""
+    return _validate_assets(art_materials)[0]
+
+
+def _validate_assets(art_materials: Any) -> Tuple[List[ValidationError], Set[str]]:
+    """Validate art_materials and return (errors, ids referenceable from active_assets)."""
     errors = []
     
     if not isinstance(art_materials, dict):
-        errors.append(ValidationError("error", "art_materials must be an object", "art_materials"))
-        return errors
+        errors.append(ValidationError("error", "art_materials must be an object", "art_materials", "invalid_type"))
+        return errors, set()
     
     if 'asset' not in art_materials:
-        errors.append(ValidationError("error", "art_materials missing 'asset' array", "art_materials"))
-        return errors
+        errors.append(ValidationError("error", "art_materials missing 'asset' array", "art_materials", "missing_field"))
+        return errors, set()
     
     assets = art_materials['asset']
     if not isinstance(assets, list):
-        errors.append(ValidationError("error", "'asset' must be an array", "art_materials.asset"))
-        return errors
+        errors.append(ValidationError("error", "'asset' must be an array", "art_materials.asset", "invalid_type"))
+        return errors, set()
     
-    seen_ids = []
+    seen_ids = set()
+    asset_ids = set()
 
     for idx, asset in enumerate(assets):
         location = f"art_materials.asset[{idx}]"
+        if not isinstance(asset, dict):
+            errors.append(ValidationError("error", "Asset must be an object", location, "invalid_type"))
+            continue
+        for key in ('id', 'file_id'):
+            if asset.get(key):
+                asset_ids.add(asset[key])
 
         # id or legacy file_id required for uniqueness
         asset_id = asset.get('id') or asset.get('file_id')
         if not asset_id:
-            errors.append(ValidationError("error", "Asset must have 'id' or 'file_id'", location))
+            errors.append(ValidationError("error", "Asset must have 'id' or 'file_id'", location, "missing_field"))
         else:
             if asset_id in seen_ids:
-                errors.append(ValidationError("error", f"Duplicate asset id: {asset_id}", location))
+                errors.append(ValidationError("error", f"Duplicate asset id: {asset_id}", location, "duplicate_asset_id"))
             else:
-                seen_ids.append(asset_id)
+                seen_ids.add(asset_id)
 
         # Check required fields (name, desc, visual_state)
         for field in ['name', 'desc', 'visual_state']:
             if field not in asset:
-                errors.append(ValidationError("error", f"Missing required field '{field}'", location))
+                errors.append(ValidationError("error", f"Missing required field '{field}'", location, "missing_field"))
 
         # image_urls (array) or legacy image_url
         if 'image_urls' not in asset and 'image_url' not in asset:
-            errors.append(ValidationError("warning", "Missing 'image_urls' or 'image_url' field", location))
+            errors.append(ValidationError("warning", "Missing 'image_urls' or 'image_url' field", location, "missing_field"))
         elif asset.get('image_urls') is not None and not isinstance(asset.get('image_urls'), list):
-            errors.append(ValidationError("warning", "'image_urls' must be an array", location))
+            errors.append(ValidationError("warning", "'image_urls' must be an array", location, "invalid_type"))
     
-    return errors
+    return errors, asset_ids
 
 
 def print_validation_results(is_valid: bool, errors: List[ValidationError]) -> None:
@@ -207,13 +306,18 @@ def print_validation_results(is_valid: bool, errors: List[ValidationError]) -> N
 
 if __name__ == "__main__":
     import sys
+    import argparse
     
-    if len(sys.argv) < 2:
-        print("Usage: python validate_storyboard.py <storyboard.json>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Validate storyboard JSON structure')
+    parser.add_argument('storyboard', help='Path to storyboard JSON file')
+    parser.add_argument('--json', action='store_true', help='Print structured results as JSON')
+    args = parser.parse_args()
     
-    filepath = sys.argv[1]
-    storyboard = load_storyboard(filepath)
+    storyboard = load_storyboard(args.storyboard, consume_journal=False)
+    if args.json:
+        report = validate_storyboard_report(storyboard)
+        print(json.dumps(report, ensure_ascii=False))
+        sys.exit(0 if report["valid"] else 1)
     is_valid, errors = validate_storyboard(storyboard)
     print_validation_results(is_valid, errors)
     
@@ -1,5 +1,3 @@
-import requests
-
 from config import (
     VOLC_STORAGE_AK,
     VOLC_STORAGE_SK,
@@ -7,34 +5,59 @@ from config import (
     VOLC_TOS_ENDPOINT,
     VOLC_TOS_REGION,
 )
-import tos
+from lazy import LazySingleton
 
 
 class VolcTosClient:
     def __init__(self, ak: str, sk: str, endpoint: str, region: str):
+        import tos
+
         self.endpoint = endpoint
         self.region = region
         self.client = tos.TosClientV2(ak, sk, endpoint, region)
 
+    def object_url(self, bucket_name: str, object_name: str) -> str:
+        return f"https://{bucket_name}.{self.endpoint}/{object_name}"
+
+    def object_exists(self, bucket_name: str, object_name: str) -> bool:
+        import tos
+
+        try:
+            self.client.head_object(bucket_name, object_name)
+            return True
+        except tos.exceptions.TosServerError as e:
+            if e.status_code == 404:
+                return False
+            raise
+
     def upload_object(self, bucket_name: str, object_name: str, object_content) -> str:
         result = self.client.put_object(bucket_name, object_name, content=object_content)
         if result.status_code != 200:
             raise Exception(f"Upload failed: {result.status_code}")
-        return f"https://{bucket_name}.{self.endpoint}/{object_name}"
+        return self.object_url(bucket_name, object_name)
+
+    def download_object(self, bucket_name: str, object_name: str) -> bytes:
+        return self.client.get_object(bucket_name, object_name).read()
 
     def upload_url_content(self, bucket_name: str, object_name: str, url: str) -> str:
+        import requests
+
         response = requests.get(url)
         if not response.ok:
             raise Exception(f"Failed to fetch url: {url}")
         result = self.client.put_object(bucket_name, object_name, content=response.content)
         if result.status_code != 200:
             raise Exception(f"Upload failed: {result.status_code}")
-        return f"https://{bucket_name}.{self.endpoint}/{object_name}"
+        return self.object_url(bucket_name, object_name)
 
 
-volc_tos_client = VolcTosClient(
-    VOLC_STORAGE_AK,
-    VOLC_STORAGE_SK,
-    VOLC_TOS_ENDPOINT,
-    VOLC_TOS_REGION,
-)
+def _create_volc_tos_client() -> VolcTosClient:
+    return VolcTosClient(
+        VOLC_STORAGE_AK,
+        VOLC_STORAGE_SK,
+        VOLC_TOS_ENDPOINT,
+        VOLC_TOS_REGION,
+    )
+
+
+volc_tos_client: VolcTosClient = LazySingleton("volc_tos", _create_volc_tos_client)
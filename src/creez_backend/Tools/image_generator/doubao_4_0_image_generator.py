@@ -8,6 +8,21 @@ from config import VOLC_API_KEY
 
 logger = get_logger(__name__)
 
+RATIO_2_WIDTH_HEIGHT = {
+    "1:1": (2048, 2048),
+    "3:4": (1728, 2304),
+    "4:3": (2304, 1728),
+    "16:9": (2560, 1440),
+    "9:16": (1440, 2560),
+    "2:3": (1664, 2496),
+    "3:2": (2496, 1664),
+    "21:9": (3024, 1296),
+}
+
+
+def get_width_height(aspect_ratio: str) -> tuple:
+    return RATIO_2_WIDTH_HEIGHT.get(aspect_ratio, (2048, 2048))
+
 
 class Doubao_4_0_ImageGenerator:
     def __init__(self):
@@ -18,17 +33,7 @@ class Doubao_4_0_ImageGenerator:
             raise ValueError("VOLC_API_KEY is required")
 
     def get_width_height(self, aspect_ratio: str) -> tuple:
-        ratio_2_width_height = {
-            "1:1": (2048, 2048),
-            "3:4": (1728, 2304),
-            "4:3": (2304, 1728),
-            "16:9": (2560, 1440),
-            "9:16": (1440, 2560),
-            "2:3": (1664, 2496),
-            "3:2": (2496, 1664),
-            "21:9": (3024, 1296),
-        }
-        return ratio_2_width_height.get(aspect_ratio, (2048, 2048))
+        return get_width_height(aspect_ratio)
 
     async def generate_image(
         self,
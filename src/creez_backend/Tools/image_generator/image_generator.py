@@ -1,8 +1,11 @@
+import time
 from typing import Optional
 
+import httpx
 from log_util import get_logger
 
 from Tools.image_generator.doubao_4_0_image_generator import Doubao_4_0_ImageGenerator
+from Tools.image_generator.model_router import AUTO_MODEL, image_model_router
 
 logger = get_logger(__name__)
 
@@ -35,11 +38,26 @@ class ImageGenerator:
     ):
         if isinstance(reference_image_list, str):
             reference_image_list = [reference_image_list]
+        if model_name == AUTO_MODEL:
+            model_name = image_model_router.choose()
         if model_name not in self.MODEL_MAP:
             raise ValueError(f"Unsupported model: {model_name}")
-        return await self.MODEL_MAP[model_name](
-            prompt=prompt,
-            aspect_ratio=aspect_ratio,
-            reference_image_list=reference_image_list,
-            **kwargs,
-        )
+        start = time.monotonic()
+        try:
+            result = await self.MODEL_MAP[model_name](
+                prompt=prompt,
+                aspect_ratio=aspect_ratio,
+                reference_image_list=reference_image_list,
+                **kwargs,
+            )
+        except httpx.HTTPStatusError as e:
+            # 4xx（内容审核、参数错误等）与模型健康无关，不计入错误率
+            code = e.response.status_code
+            if code >= 500 or code == 429:
+                image_model_router.record(model_name, time.monotonic() - start, ok=False)
+            raise
+        except Exception:
+            image_model_router.record(model_name, time.monotonic() - start, ok=False)
+            raise
+        image_model_router.record(model_name, time.monotonic() - start, ok=True)
+        return result
@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from log_util import get_logger
+
+from Tools.utils_price_calculator import image_price_calculator
+
+logger = get_logger(__name__)
+
+AUTO_MODEL = "auto"
+
+
+class _ModelStats:
+    __slots__ = ("latency", "error_rate", "samples", "updated_at")
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.updated_at = 0.0
+
+
+class LatencyAwareModelRouter:
+    """按实时延迟/错误率的 EWMA，在同价位的等价模型中选择最快的健康模型。
+
+    - 没有样本的模型优先被选中，以便尽快获得统计
+    - 错误率 EWMA 超过 max_error_rate 视为不健康；全部不健康时选错误率最低的
+    - 以 explore_ratio 的概率在健康模型中随机选择，避免统计长期不更新
+    - 不健康的模型每隔 probe_interval 秒放行一次请求作为探测，恢复后重新参与选择
+    """
+
+    def __init__(
+        self,
+        candidates: List[str],
+        alpha: float = 0.2,
+        max_error_rate: float = 0.5,
+        explore_ratio: float = 0.05,
+        probe_interval: float = 30.0,
+    ):
+        self.candidates = candidates
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.explore_ratio = explore_ratio
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _ModelStats] = {m: _ModelStats() for m in candidates}
+
+    def _same_tier(self, base_model: str) -> List[str]:
+        price = image_price_calculator(model=base_model)
+        return [m for m in self.candidates if image_price_calculator(model=m) == price]
+
+    def choose(self, base_model: Optional[str] = None) -> str:
+        """在与 base_model（默认第一个候选）同价位的候选中选模型"""
+        pool = self._same_tier(base_model or self.candidates[0]) or self.candidates[:1]
+        with self._lock:
+            untried = [m for m in pool if self._stats[m].samples == 0]
+            if untried:
+                return random.choice(untried)
+            healthy = [m for m in pool if self._stats[m].error_rate <= self.max_error_rate]
+            now = time.time()
+            for m in pool:
+                stats = self._stats[m]
+                if m not in healthy and now - stats.updated_at > self.probe_interval:
+                    stats.updated_at = now
+                    return m
+            if not healthy:
+                return min(pool, key=lambda m: self._stats[m].error_rate)
+            if len(healthy) > 1 and random.random() < self.explore_ratio:
+                return random.choice(healthy)
+            return min(healthy, key=lambda m: self._stats[m].latency or 0.0)
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                return
+            a = self.alpha
+            if ok:
+                stats.latency = latency if stats.latency is None else a * latency + (1 - a) * stats.latency
+            stats.error_rate = a * (0.0 if ok else 1.0) + (1 - a) * stats.error_rate
+            stats.samples += 1
+            stats.updated_at = time.time()
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                m: {"latency": s.latency, "error_rate": s.error_rate, "samples": s.samples}
+                for m, s in self._stats.items()
+            }
+
+
+image_model_router = LatencyAwareModelRouter(["doubao-seedream-4-0", "doubao-seedream-4-5"])
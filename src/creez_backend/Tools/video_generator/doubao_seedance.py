@@ -63,6 +63,27 @@ class DoubaoSeedanceVideoGenerator:
         if not task_id:
             raise Exception("No task ID in response")
 
+        try:
+            return await self._wait_for_task(task_id, headers)
+        except asyncio.CancelledError:
+            # 本地任务被取消：删除上游任务，释放 Seedance 并发额度
+            await self.cancel_task(task_id)
+            raise
+
+    async def cancel_task(self, task_id: str) -> bool:
+        """取消/删除 Seedance 任务（排队中的任务会被取消）；失败只记录日志"""
+        headers = {"Authorization": f"Bearer {self.API_KEY}"}
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                resp = await client.delete(f"{self.seedance_url}/{task_id}", headers=headers)
+                resp.raise_for_status()
+            logger.info("Cancelled Seedance task %s", task_id)
+            return True
+        except Exception as e:
+            logger.error("Failed to cancel Seedance task %s: %s", task_id, e)
+            return False
+
+    async def _wait_for_task(self, task_id: str, headers: dict) -> dict:
         start_time = time.time()
         while time.time() - start_time < 3600:
             query_url = f"{self.seedance_url}/{task_id}"
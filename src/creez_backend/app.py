@@ -0,0 +1,66 @@
+"""Web 应用：由 main.py 或 `uvicorn app:app` 加载"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from config import CONFIG_WATCH_ENABLED, STARTUP_WARMUP_ENABLED
+from configmap_utils import config_provider
+from log_util import get_logger
+from responses import FastJSONResponse
+from routers.image import router as image_router
+from routers.reference import router as reference_router
+from routers.video import router as video_router
+from startup import readiness, start_background_warm_up
+
+logger = get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 客户端均为懒加载：启动时只在后台预热，不阻塞监听端口
+    if STARTUP_WARMUP_ENABLED:
+        start_background_warm_up()
+    if CONFIG_WATCH_ENABLED:
+        config_provider.start_watching()
+    yield
+    config_provider.stop_watching()
+
+
+app = FastAPI(
+    title="Creez Backend",
+    description="AI image/video generation for Creez",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(image_router)
+app.include_router(video_router)
+app.include_router(reference_router)
+
+
+@app.get("/ping")
+async def ping():
+    return {"message": "pong"}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    loop = asyncio.get_event_loop()
+    state = await loop.run_in_executor(None, readiness, STARTUP_WARMUP_ENABLED)
+    return FastJSONResponse(content=state, status_code=200 if state["ready"] else 503)
+
@@ -0,0 +1,203 @@
+"""冷数据归档：把终态且超过 N 天的 image_tasks / video_tasks 行与 token_usage 记录移出热表。
+
+- 按 created_at 日期分区写入 TOS：archive/{表名}/dt=YYYY-MM-DD/{批次}.jsonl.gz（每行一条原始记录）
+- 任务表额外写入 task_archive_index（task_id, table_name, object_key），轮询时按 task_id 回读
+- 顺序为 上传 → 写索引 → 删除热表行；中途失败时下次重跑会重新归档，索引按 task_id upsert 指向最新对象
+
+定时执行（K8s CronJob 或手动）：
+    python archive.py --days 30
+    python archive.py --tables image_tasks video_tasks --dry-run
+"""
+import argparse
+import gzip
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_OBJECT_PREFIX, VOLC_TOS_BUCKET
+from log_util import get_logger
+from Storage.volc_tos import volc_tos_client
+from supabase_client import supabase_client
+
+logger = get_logger(__name__)
+
+ARCHIVE_INDEX_TABLE = "task_archive_index"
+TERMINAL_STATUSES = ["completed", "failed", "overtime", "cancelled"]
+# 表名 -> (主键列, 是否只归档终态行)
+ARCHIVE_TABLES = {
+    "image_tasks": ("task_id", True),
+    "video_tasks": ("task_id", True),
+    "token_usage": ("id", False),
+}
+TASK_TABLES = ("image_tasks", "video_tasks")
+
+_PARTITION_CACHE_MAX = 32
+
+
+def _encode_rows(rows: List[dict]) -> bytes:
+    lines = "\n".join(json.dumps(row, ensure_ascii=False, default=str) for row in rows)
+    return gzip.compress(lines.encode("utf-8"))
+
+
+def _decode_rows(data: bytes) -> List[dict]:
+    text = gzip.decompress(data).decode("utf-8")
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _archive_filters(table: str, cutoff: datetime) -> dict:
+    filters = {"created_at__lt": cutoff.isoformat()}
+    if ARCHIVE_TABLES[table][1]:
+        filters["status__in_"] = TERMINAL_STATUSES
+    return filters
+
+
+def _write_partitions(table: str, rows: List[dict]) -> Dict[str, List[dict]]:
+    """按 created_at 日期分组上传，返回 {object_key: rows}"""
+    by_day: Dict[str, List[dict]] = defaultdict(list)
+    for row in rows:
+        by_day[str(row.get("created_at") or "")[:10] or "unknown"].append(row)
+    batch = uuid4().hex
+    written = {}
+    for day, part in by_day.items():
+        object_key = f"{ARCHIVE_OBJECT_PREFIX}{table}/dt={day}/{batch}.jsonl.gz"
+        volc_tos_client.upload_object(VOLC_TOS_BUCKET, object_key, _encode_rows(part))
+        written[object_key] = part
+    return written
+
+
+def archive_table(
+    table: str,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> int:
+    """归档单个表，返回归档（dry_run 时为待归档）的行数"""
+    if table not in ARCHIVE_TABLES:
+        raise ValueError(f"Unsupported archive table: {table}")
+    key_column = ARCHIVE_TABLES[table][0]
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    filters = _archive_filters(table, cutoff)
+
+    if dry_run:
+        rows = supabase_client.select(table, filters=filters, columns=[key_column])
+        logger.info("[dry-run] %s: %s rows older than %s", table, len(rows), cutoff.date())
+        return len(rows)
+
+    total = 0
+    archived = set()  # 本次已归档的主键：同一行不会被写入两次
+    while True:
+        rows = supabase_client.select(table, filters=filters, order_by="created_at", limit=batch_size)
+        if not rows:
+            break
+        fresh = [row for row in rows if row[key_column] not in archived]
+        if not fresh:
+            # 已归档的行仍留在热表：删除没有生效，继续循环只会重复查询同一批
+            raise RuntimeError(f"{table}: archived rows were not deleted, stopping to avoid an endless loop")
+        written = _write_partitions(table, fresh)
+        if table in TASK_TABLES:
+            index_rows = [
+                {"task_id": row[key_column], "table_name": table, "object_key": object_key}
+                for object_key, part in written.items()
+                for row in part
+            ]
+            supabase_client.client.table(ARCHIVE_INDEX_TABLE).upsert(index_rows).execute()
+        ids = [row[key_column] for row in fresh]
+        archived.update(ids)
+        response = supabase_client.client.table(table).delete().in_(key_column, ids).execute()
+        deleted = {row.get(key_column) for row in (response.data or [])} & set(ids)
+        if not deleted:
+            # 典型原因：使用 anon key 时 RLS 拒绝删除，delete 不报错但影响 0 行
+            raise RuntimeError(
+                f"{table}: delete removed 0 of {len(ids)} archived rows (check the key has delete permission)"
+            )
+        if len(deleted) < len(ids):
+            logger.warning("Deleted only %s of %s archived rows from %s", len(deleted), len(ids), table)
+        total += len(deleted)
+        logger.info("Archived %s rows from %s into %s objects", len(deleted), table, len(written))
+        if len(rows) < batch_size:
+            break
+    return total
+
+
+def archive_all(
+    tables: Iterable[str] = tuple(ARCHIVE_TABLES),
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    result = {}
+    for table in tables:
+        try:
+            result[table] = archive_table(table, older_than_days, dry_run=dry_run)
+        except Exception as e:
+            logger.error("Archive %s failed: %s", table, e)
+            result[table] = -1
+    return result
+
+
+class _PartitionCache:
+    """最近读取的归档分区：{object_key: {task_id: row}}"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Dict[str, dict]]" = OrderedDict()
+
+    def get(self, object_key: str) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._data.get(object_key)
+            if rows is not None:
+                self._data.move_to_end(object_key)
+                return rows
+        rows = {
+            row.get("task_id"): row
+            for row in _decode_rows(volc_tos_client.download_object(VOLC_TOS_BUCKET, object_key))
+        }
+        with self._lock:
+            self._data[object_key] = rows
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return rows
+
+
+_partition_cache = _PartitionCache(_PARTITION_CACHE_MAX)
+
+
+def lookup_archived_tasks(table: str, task_ids: List[str], columns: Optional[List[str]] = None) -> Dict[str, dict]:
+    """热表中查不到的任务回读归档；columns 不为空时只保留这些字段"""
+    if table not in TASK_TABLES or not task_ids:
+        return {}
+    index_rows = supabase_client.select(
+        ARCHIVE_INDEX_TABLE,
+        filters={"task_id__in_": task_ids, "table_name": table},
+        columns=["task_id", "object_key"],
+    )
+    by_object: Dict[str, List[str]] = defaultdict(list)
+    for row in index_rows:
+        by_object[row["object_key"]].append(row["task_id"])
+
+    found = {}
+    for object_key, ids in by_object.items():
+        partition = _partition_cache.get(object_key)
+        for task_id in ids:
+            row = partition.get(task_id)
+            if row is None:
+                continue
+            found[task_id] = {c: row.get(c) for c in columns} if columns else row
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="归档终态任务与用量记录到 TOS")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="归档早于多少天的记录")
+    parser.add_argument("--tables", nargs="+", default=list(ARCHIVE_TABLES), choices=list(ARCHIVE_TABLES))
+    parser.add_argument("--dry-run", action="store_true", help="只统计待归档行数")
+    args = parser.parse_args()
+    result = archive_all(args.tables, args.days, dry_run=args.dry_run)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""冷启动基准：在全新子进程中测量 `import app` 耗时与首个 /health 响应耗时。
+
+用法（在 creez_backend 目录下，需已配置 .env）：
+    python benchmarks/import_time.py            # 默认 5 次取中位数
+    python benchmarks/import_time.py -n 10 --top 15   # 额外输出 -X importtime 中累计耗时最高的模块
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.app) as client:
+    assert client.get("/health").status_code == 200
+    t2 = time.perf_counter()
+print(f"{t1 - t0:.6f} {t2 - t0:.6f}")
+"""
+
+
+def _run_probe() -> tuple:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    import_s, health_s = out.stdout.strip().splitlines()[-1].split()
+    return float(import_s), float(health_s)
+
+
+def _top_imports(top: int) -> list:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="creez_backend 冷启动基准")
+    parser.add_argument("-n", type=int, default=5, help="子进程次数")
+    parser.add_argument("--top", type=int, default=0, help="输出累计导入耗时最高的 N 个模块")
+    args = parser.parse_args()
+
+    samples = [_run_probe() for _ in range(args.n)]
+    imports = [s[0] for s in samples]
+    healths = [s[1] for s in samples]
+    print(f"import app:         median {statistics.median(imports) * 1000:.1f} ms, "
+          f"min {min(imports) * 1000:.1f} ms")
+    print(f"first /health:      median {statistics.median(healths) * 1000:.1f} ms, "
+          f"min {min(healths) * 1000:.1f} ms")
+    if args.top:
+        print("top imports (cumulative):")
+        for cumulative_us, name in _top_imports(args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
-from configmap_utils import get_configmap_value
+from configmap_utils import get_cert_value, get_configmap_value
 
 # 从本文件所在目录（Creez_backend）加载 .env，避免 debug/不同 cwd 下找不到
 _env_dir = Path(__file__).resolve().parent
@@ -16,6 +16,24 @@ elif config_role == "Prod":
 else:
     load_dotenv(_env_dir / ".env", override=True)
 
+
+def live_int(key: str, default: int) -> int:
+    """运行时可热更新的整数配置：configmap 中存在同名 key 时优先，否则使用 default（通常为 .env 中的值）"""
+    value = get_configmap_value(key)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def live_str(key: str, default: str, secret: bool = False) -> str:
+    """运行时可热更新的字符串配置；secret=True 时从 secret 目录读取"""
+    value = get_cert_value(key) if secret else get_configmap_value(key)
+    return value if value else default
+
+
 # Supabase
 SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL", "")
 SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY", "")
@@ -35,3 +53,59 @@ DOUBAO_BASE_URL = os.getenv("DOUBAO_BASE_URL", "https://ark.cn-beijing.volces.co
 
 # Auth: header name for user_id (client must send)
 USER_ID_HEADER = "X-User-Id"
+
+# 幂等：客户端重试/重复提交时携带相同的 Idempotency-Key，返回已创建的 task_id
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+# 参考图上传：二进制直传 TOS，生成请求只携带 reference_id / url
+REFERENCE_UPLOAD_MAX_BYTES = int(os.getenv("REFERENCE_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+REFERENCE_OBJECT_PREFIX = "references/"
+
+# 参考图/首尾帧预处理：超过目标模型可用分辨率时缩小并重新编码（Pillow，进程池）
+REFERENCE_NORMALIZE_ENABLED = os.getenv("REFERENCE_NORMALIZE_ENABLED", "true").lower() == "true"
+REFERENCE_NORMALIZE_FORMAT = os.getenv("REFERENCE_NORMALIZE_FORMAT", "JPEG").upper()  # JPEG / WEBP
+REFERENCE_NORMALIZE_QUALITY = int(os.getenv("REFERENCE_NORMALIZE_QUALITY", "90"))
+# 尺寸不超限且小于该字节数的参考图原样透传
+REFERENCE_NORMALIZE_PASSTHROUGH_BYTES = int(os.getenv("REFERENCE_NORMALIZE_PASSTHROUGH_BYTES", str(1024 * 1024)))
+
+# 生成结果衍生图：完成后异步生成 WebP 缩略图/预览图，与原图同目录存入 TOS
+IMAGE_DERIVATIVES_ENABLED = os.getenv("IMAGE_DERIVATIVES_ENABLED", "true").lower() == "true"
+IMAGE_DERIVATIVE_SIZES = {"thumb": 320, "preview": 1280}  # 名称 -> 长边像素
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv("IMAGE_DERIVATIVE_QUALITY", "80"))
+
+# 图片/视频处理进程池大小（参考图预处理、衍生图生成共用）
+MEDIA_PROCESS_WORKERS = int(os.getenv("MEDIA_PROCESS_WORKERS", "2"))
+
+# 生成视频衍生文件：封面 JPEG（poster）与低码率预览（preview），需要 ffmpeg；无 ffmpeg 时封面回退为首帧图
+VIDEO_DERIVATIVES_ENABLED = os.getenv("VIDEO_DERIVATIVES_ENABLED", "true").lower() == "true"
+VIDEO_PREVIEW_HEIGHT = int(os.getenv("VIDEO_PREVIEW_HEIGHT", "360"))
+VIDEO_POSTER_MAX_SIDE = 1280
+
+# 生成任务调度：同时执行的任务上限，bulk（批量）任务最多占用的槽位
+IMAGE_MAX_CONCURRENT_TASKS = int(os.getenv("IMAGE_MAX_CONCURRENT_TASKS", "32"))
+IMAGE_BULK_MAX_CONCURRENT_TASKS = int(os.getenv("IMAGE_BULK_MAX_CONCURRENT_TASKS", "24"))
+VIDEO_MAX_CONCURRENT_TASKS = int(os.getenv("VIDEO_MAX_CONCURRENT_TASKS", "16"))
+VIDEO_BULK_MAX_CONCURRENT_TASKS = int(os.getenv("VIDEO_BULK_MAX_CONCURRENT_TASKS", "12"))
+
+# 并发配额（0 表示不限）：running 超限的任务在调度器中排队等待；in-flight（排队 + 执行中）超限的新任务直接拒绝（429）
+IMAGE_USER_MAX_RUNNING = int(os.getenv("IMAGE_USER_MAX_RUNNING", "8"))
+IMAGE_USER_MAX_INFLIGHT = int(os.getenv("IMAGE_USER_MAX_INFLIGHT", "200"))
+IMAGE_PROJECT_MAX_RUNNING = int(os.getenv("IMAGE_PROJECT_MAX_RUNNING", "8"))
+IMAGE_PROJECT_MAX_INFLIGHT = int(os.getenv("IMAGE_PROJECT_MAX_INFLIGHT", "200"))
+VIDEO_USER_MAX_RUNNING = int(os.getenv("VIDEO_USER_MAX_RUNNING", "4"))
+VIDEO_USER_MAX_INFLIGHT = int(os.getenv("VIDEO_USER_MAX_INFLIGHT", "50"))
+VIDEO_PROJECT_MAX_RUNNING = int(os.getenv("VIDEO_PROJECT_MAX_RUNNING", "4"))
+VIDEO_PROJECT_MAX_INFLIGHT = int(os.getenv("VIDEO_PROJECT_MAX_INFLIGHT", "50"))
+
+# 启动预热：进程启动后在后台线程中创建 Supabase / TOS / LLM 客户端，/ready 在预热完成前返回 503
+STARTUP_WARMUP_ENABLED = os.getenv("STARTUP_WARMUP_ENABLED", "true").lower() == "true"
+
+# 配置热更新：后台监听 configmap / secret 目录（间隔见 CONFIG_WATCH_INTERVAL_SECONDS），变化时推送给订阅者
+CONFIG_WATCH_ENABLED = os.getenv("CONFIG_WATCH_ENABLED", "true").lower() == "true"
+
+# 归档：终态超过 ARCHIVE_AFTER_DAYS 天的任务行、用量记录移到 TOS（按日期分区的 JSONL.gz），轮询时回读
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_OBJECT_PREFIX = "archive/"
+ARCHIVE_READ_THROUGH_ENABLED = os.getenv("ARCHIVE_READ_THROUGH_ENABLED", "true").lower() == "true"
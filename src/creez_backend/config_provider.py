@@ -0,0 +1,173 @@
+"""可热更新的配置源：K8s configmap（/root/config/）与 secret（/root/certs/）目录的内存缓存。
+
+- 首次读取时一次性扫描目录，之后 get / get_cert 只查内存，不再逐次打开文件
+- start_watching() 启动后台线程监听目录变化：装有 inotify_simple 时用 inotify，否则按间隔轮询
+  （K8s 更新 configmap 时会原子替换 ..data 软链接，两种方式都按文件 mtime/size 判断变化）
+- 值发生变化时通知订阅者：subscribe(callback, keys) 中 callback 收到 {key: 新值}（删除时为 None）
+
+约定：configmap 中与环境变量同名的 key 覆盖 .env 中的值，见 config.live_int / config.live_str。
+"""
+import os
+import stat
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from log_util import get_logger
+
+logger = get_logger(__name__)
+
+Subscriber = Callable[[Dict[str, Optional[str]]], None]
+
+
+class _DirectorySource:
+    """一个目录下每个文件对应一个 key；隐藏文件（如 K8s 的 ..data）忽略"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: Dict[str, str] = {}
+        self._signature: Dict[str, Tuple[int, int]] = {}
+
+    def _stat_files(self) -> Dict[str, Tuple[int, int]]:
+        if not os.path.isdir(self.path):
+            return {}
+        signature = {}
+        for name in os.listdir(self.path):
+            if name.startswith("."):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))  # 跟随软链接
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                signature[name] = (st.st_mtime_ns, st.st_size)
+        return signature
+
+    def reload(self) -> Dict[str, Optional[str]]:
+        """只重新读取 mtime/size 变化的文件，返回变化的 {key: 新值}"""
+        signature = self._stat_files()
+        changes: Dict[str, Optional[str]] = {}
+        for name in set(self._signature) - set(signature):
+            self.values.pop(name, None)
+            changes[name] = None
+        for name, sig in signature.items():
+            if self._signature.get(name) == sig:
+                continue
+            try:
+                with open(os.path.join(self.path, name)) as f:
+                    value = (f.read() or "").strip()
+            except OSError as e:
+                logger.warning("Failed to read config file %s%s: %s", self.path, name, e)
+                continue
+            if self.values.get(name) != value:
+                self.values[name] = value
+                changes[name] = value
+        self._signature = signature
+        return changes
+
+
+class ConfigProvider:
+    def __init__(self, configmap_path: str, secret_path: str, poll_interval: float = 10.0):
+        self._config = _DirectorySource(configmap_path)
+        self._secret = _DirectorySource(secret_path)
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._subscribers: List[Tuple[Optional[frozenset], Subscriber]] = []
+        self._watch_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._config.reload()
+                self._secret.reload()
+                self._loaded = True
+
+    def get(self, key: str, default=None):
+        self._ensure_loaded()
+        return self._config.values.get(key, default)
+
+    def get_cert(self, key: str, default=None):
+        self._ensure_loaded()
+        return self._secret.values.get(key, default)
+
+    def subscribe(self, callback: Subscriber, keys: Optional[Iterable[str]] = None) -> None:
+        """keys 为空时任何变化都通知；否则只在这些 key 变化时通知（只传入相关的 key）"""
+        with self._lock:
+            self._subscribers.append((frozenset(keys) if keys else None, callback))
+
+    def refresh(self) -> Dict[str, Optional[str]]:
+        """重新检查两个目录，通知订阅者并返回变化的 key"""
+        with self._lock:
+            if not self._loaded:
+                self._ensure_loaded()
+                return {}
+            changes = self._config.reload()
+            changes.update(self._secret.reload())
+            subscribers = list(self._subscribers)
+        if changes:
+            logger.info("Config changed: %s", sorted(changes))
+            for keys, callback in subscribers:
+                relevant = changes if keys is None else {k: v for k, v in changes.items() if k in keys}
+                if not relevant:
+                    continue
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    logger.error("Config subscriber %s failed: %s", getattr(callback, "__name__", callback), e)
+        return changes
+
+    def start_watching(self) -> None:
+        with self._lock:
+            if self._watch_thread is not None:
+                return
+            self._ensure_loaded()
+            self._stop.clear()
+            self._watch_thread = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+            self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        thread, self._watch_thread = self._watch_thread, None
+        if thread is not None:
+            thread.join(timeout=self.poll_interval + 1)
+
+    def _watch(self) -> None:
+        inotify = self._open_inotify()
+        mode = "inotify" if inotify is not None else "polling"
+        logger.info("Config watcher started (%s, interval %ss)", mode, self.poll_interval)
+        try:
+            while not self._stop.is_set():
+                if inotify is not None:
+                    # 有事件时立即返回；超时同样刷新一次，兼容目录在启动后才挂载的情况
+                    inotify.read(timeout=int(self.poll_interval * 1000))
+                else:
+                    self._stop.wait(self.poll_interval)
+                if self._stop.is_set():
+                    break
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error("Config refresh failed: %s", e)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _open_inotify(self):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            return None
+        watch_flags = flags.CREATE | flags.MODIFY | flags.DELETE | flags.MOVED_TO | flags.CLOSE_WRITE
+        inotify = INotify()
+        watched = 0
+        for source in (self._config, self._secret):
+            if os.path.isdir(source.path):
+                inotify.add_watch(source.path, watch_flags)
+                watched += 1
+        if not watched:
+            inotify.close()
+            return None
+        return inotify
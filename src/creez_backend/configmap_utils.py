@@ -1,21 +1,25 @@
-"""与 mcp_host_backend 一致：从 K8s configmap 读取配置，本地开发时回退默认值"""
+"""与 mcp_host_backend 一致：从 K8s configmap 读取配置，本地开发时回退默认值。
+
+读取走 config_provider 的内存缓存（首次调用时扫描目录），不再每次打开文件；
+目录变化由 config_provider.start_watching() 在后台刷新。
+"""
 import os
 
+from config_provider import ConfigProvider
+
 CONFIGMAP_PATH = "/root/config/"
 SECRET_PATH = "/root/certs/"
 
+config_provider = ConfigProvider(
+    CONFIGMAP_PATH,
+    SECRET_PATH,
+    poll_interval=float(os.getenv("CONFIG_WATCH_INTERVAL_SECONDS", "10")),
+)
+
 
 def get_configmap_value(key: str, defaultvalue=None):
-    config = CONFIGMAP_PATH + key
-    if not os.path.exists(config):
-        return defaultvalue
-    with open(config) as f:
-        return (f.read() or "").strip()
+    return config_provider.get(key, defaultvalue)
 
 
 def get_cert_value(key: str, defaultvalue=None):
-    config = SECRET_PATH + key
-    if not os.path.exists(config):
-        return defaultvalue
-    with open(config) as f:
-        return (f.read() or "").strip()
+    return config_provider.get_cert(key, defaultvalue)
@@ -0,0 +1,120 @@
+"""生成结果的衍生文件：与原文件同目录存入 TOS，任务行的 derivatives 字段记录 URL。
+
+derivatives 格式：{名称: [url, ...]}，列表与 image_urls / video_urls 按下标一一对应，失败项为 ""。
+"""
+import asyncio
+import base64
+from typing import Dict, List, Optional
+
+import httpx
+
+from config import (
+    IMAGE_DERIVATIVE_QUALITY,
+    IMAGE_DERIVATIVE_SIZES,
+    IMAGE_DERIVATIVES_ENABLED,
+    VIDEO_DERIVATIVES_ENABLED,
+    VIDEO_POSTER_MAX_SIDE,
+    VIDEO_PREVIEW_HEIGHT,
+    VOLC_TOS_BUCKET,
+)
+from image_processing import downscale_and_encode, make_derivatives
+from log_util import get_logger
+from process_pool import run_in_process_pool
+from Storage.volc_tos import volc_tos_client
+from video_processing import ffmpeg_path, ffmpeg_video_derivatives
+
+logger = get_logger(__name__)
+
+
+def _object_stem(url: str) -> str:
+    """https://bucket.endpoint/abc.png → abc"""
+    name = url.rsplit("/", 1)[-1].split("?", 1)[0]
+    return name.rsplit(".", 1)[0] if "." in name else name
+
+
+async def _fetch_bytes(url: str) -> bytes:
+    if url.startswith("data:"):
+        return base64.b64decode(url.partition(",")[2])
+    async with httpx.AsyncClient(timeout=120) as client:
+        resp = await client.get(url)
+        resp.raise_for_status()
+        return resp.content
+
+
+async def _image_derivatives_for(url: str) -> Dict[str, str]:
+    data = await _fetch_bytes(url)
+    encoded = await run_in_process_pool(
+        make_derivatives, data, IMAGE_DERIVATIVE_SIZES, "WEBP", IMAGE_DERIVATIVE_QUALITY
+    )
+    stem = _object_stem(url)
+    loop = asyncio.get_event_loop()
+    out = {}
+    for name, content in encoded.items():
+        out[name] = await loop.run_in_executor(
+            None, volc_tos_client.upload_object, VOLC_TOS_BUCKET, f"{stem}_{name}.webp", content
+        )
+    return out
+
+
+async def generate_image_derivatives(image_urls: List[str]) -> Dict[str, List[str]]:
+    """为已上传的图片生成 WebP 缩略图/预览图，返回 {名称: [url, ...]}；未启用时返回 {}"""
+    if not IMAGE_DERIVATIVES_ENABLED or not image_urls:
+        return {}
+    results = await asyncio.gather(
+        *(_image_derivatives_for(u) for u in image_urls), return_exceptions=True
+    )
+    derivatives = {name: [] for name in IMAGE_DERIVATIVE_SIZES}
+    for url, res in zip(image_urls, results):
+        if isinstance(res, Exception):
+            logger.error("Generate image derivatives failed for %s: %s", url, res)
+            res = {}
+        for name in derivatives:
+            derivatives[name].append(res.get(name, ""))
+    return derivatives
+
+
+_VIDEO_DERIVATIVE_EXT = {"poster": ".jpg", "preview": ".mp4"}
+
+
+async def _video_derivatives_for(url: str, first_frame_image: Optional[str]) -> Dict[str, str]:
+    encoded = {}
+    if ffmpeg_path():
+        data = await _fetch_bytes(url)
+        encoded = await run_in_process_pool(ffmpeg_video_derivatives, data, VIDEO_PREVIEW_HEIGHT)
+    if "poster" not in encoded and first_frame_image:
+        # 无 ffmpeg 或抽帧失败：图生视频的首帧即为视频第一帧，直接转码作为封面
+        frame = await _fetch_bytes(first_frame_image)
+        poster, _, _, _ = await run_in_process_pool(downscale_and_encode, frame, VIDEO_POSTER_MAX_SIDE, "JPEG", 85)
+        encoded["poster"] = poster
+
+    stem = _object_stem(url)
+    loop = asyncio.get_event_loop()
+    out = {}
+    for name, content in encoded.items():
+        out[name] = await loop.run_in_executor(
+            None,
+            volc_tos_client.upload_object,
+            VOLC_TOS_BUCKET,
+            f"{stem}_{name}{_VIDEO_DERIVATIVE_EXT[name]}",
+            content,
+        )
+    return out
+
+
+async def generate_video_derivatives(
+    video_urls: List[str], first_frame_image: Optional[str] = None
+) -> Dict[str, List[str]]:
+    """为已上传的视频生成封面（poster）与低码率预览（preview），返回 {名称: [url, ...]}；未启用时返回 {}"""
+    if not VIDEO_DERIVATIVES_ENABLED or not video_urls:
+        return {}
+    results = await asyncio.gather(
+        *(_video_derivatives_for(u, first_frame_image) for u in video_urls), return_exceptions=True
+    )
+    derivatives = {name: [] for name in _VIDEO_DERIVATIVE_EXT}
+    for url, res in zip(video_urls, results):
+        if isinstance(res, Exception):
+            logger.error("Generate video derivatives failed for %s: %s", url, res)
+            res = {}
+        for name in derivatives:
+            derivatives[name].append(res.get(name, ""))
+    return derivatives
@@ -1,3 +1,3 @@
-from .self_defined import OutOfQuotaException
+from .self_defined import OutOfQuotaException, QuotaExceededException
 
-__all__ = ["OutOfQuotaException"]
+__all__ = ["OutOfQuotaException", "QuotaExceededException"]
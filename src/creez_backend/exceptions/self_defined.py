@@ -2,3 +2,15 @@ class OutOfQuotaException(Exception):
     """超出配额异常"""
 
     pass
+
+
+class QuotaExceededException(Exception):
+    """超出并发配额异常"""
+
+    pass
+
+
+class IdempotencyStoreUnavailableException(Exception):
+    """幂等键存储不可用异常"""
+
+    pass
@@ -0,0 +1,119 @@
+"""幂等键：同一用户同一 Idempotency-Key 的重复提交返回已创建的 task_id，避免重复生成与扣费。
+
+先查进程内 TTL 缓存，再查 Supabase 的 idempotency_keys 表（多实例共享、重启不丢）。
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from config import IDEMPOTENCY_TTL_SECONDS
+from exceptions.self_defined import IdempotencyStoreUnavailableException
+from log_util import get_logger
+from supabase_client import supabase_client
+
+logger = get_logger(__name__)
+
+IDEMPOTENCY_TABLE = "idempotency_keys"
+# 客户端自定义的 key 过长时截断，避免写库/索引异常
+_MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[str, float]] = {}  # scoped_key -> (task_id, expires_at)
+
+    @staticmethod
+    def _scoped_key(scope: str, user_id: str, key: str) -> str:
+        return f"{scope}:{user_id}:{key.strip()[:_MAX_KEY_LENGTH]}"
+
+    def _get_memory(self, scoped_key: str) -> Optional[str]:
+        entry = self._entries.get(scoped_key)
+        if not entry:
+            return None
+        task_id, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(scoped_key, None)
+            return None
+        return task_id
+
+    def _set_memory(self, scoped_key: str, task_id: str) -> None:
+        now = time.monotonic()
+        if len(self._entries) > 10000:
+            self._entries = {k: v for k, v in self._entries.items() if v[1] >= now}
+        self._entries[scoped_key] = (task_id, now + self.ttl_seconds)
+
+    def _get_durable(self, scoped_key: str) -> Optional[str]:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        rows = supabase_client.select(
+            table=IDEMPOTENCY_TABLE,
+            filters={"key": scoped_key, "created_at__gte": cutoff.isoformat()},
+            columns=["task_id"],
+            order_by="created_at",
+            order_desc=True,
+        )
+        if rows:
+            return rows[0].get("task_id")
+        return None
+
+    def claim(self, scope: str, user_id: str, key: str, task_id: str) -> Tuple[str, bool]:
+        """为 key 绑定 task_id。返回 (task_id, created)：created=False 表示重复提交，task_id 为已有任务。
+        会同步访问 Supabase，路由中需通过 run_in_executor 调用。
+        库不可用、无法确认 key 是否已被其他实例占用时抛出 IdempotencyStoreUnavailableException。"""
+        scoped_key = self._scoped_key(scope, user_id, key)
+        with self._lock:
+            existing = self._get_memory(scoped_key)
+            if existing:
+                return existing, False
+            # 先占位，同进程内并发的重复提交直接命中内存
+            self._set_memory(scoped_key, task_id)
+
+        try:
+            existing = self._get_durable(scoped_key)
+            if existing:
+                with self._lock:
+                    self._set_memory(scoped_key, existing)
+                return existing, False
+            supabase_client.insert(
+                IDEMPOTENCY_TABLE,
+                {"key": scoped_key, "task_id": task_id, "user_id": user_id},
+            )
+        except Exception as e:
+            # 唯一约束冲突（其他实例抢先写入）时以库中记录为准
+            logger.warning("Idempotency durable store error for %s: %s", scoped_key, e)
+            try:
+                existing = self._get_durable(scoped_key)
+            except Exception as retry_error:
+                logger.error("Idempotency durable store unavailable for %s: %s", scoped_key, retry_error)
+                existing = None
+            if existing and existing != task_id:
+                with self._lock:
+                    self._set_memory(scoped_key, existing)
+                return existing, False
+            if existing != task_id:
+                # 库中没有记录：无法跨实例去重，不再静默退化为仅内存，交由调用方返回 503 让客户端用同一 key 重试
+                with self._lock:
+                    entry = self._entries.get(scoped_key)
+                    if entry and entry[0] == task_id:
+                        self._entries.pop(scoped_key, None)
+                raise IdempotencyStoreUnavailableException(f"幂等键存储不可用: {e}") from e
+        return task_id, True
+
+    def release(self, scope: str, user_id: str, key: str, task_id: str) -> None:
+        """任务未能创建时释放 key，允许客户端用同一 key 重试。会同步访问 Supabase，路由中需通过 run_in_executor 调用"""
+        scoped_key = self._scoped_key(scope, user_id, key)
+        with self._lock:
+            entry = self._entries.get(scoped_key)
+            if entry and entry[0] == task_id:
+                self._entries.pop(scoped_key, None)
+        try:
+            supabase_client.client.table(IDEMPOTENCY_TABLE).delete().eq("key", scoped_key).eq(
+                "task_id", task_id
+            ).execute()
+        except Exception as e:
+            logger.error("Failed to release idempotency key %s: %s", scoped_key, e)
+
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TTL_SECONDS)
@@ -4,6 +4,7 @@ from uuid import uuid4
 
 from exceptions.self_defined import OutOfQuotaException
 from log_util import get_logger
+from reference_image_helper import image_reference_max_side, normalize_reference_urls
 from Storage.volc_tos import volc_tos_client
 from Tools.utils_price_calculator import image_price_calculator
 import token_usage_utils
@@ -26,11 +27,14 @@ async def generate_and_save_image(
     if user_id and not await token_usage_utils.check_user_points(user_id):
         raise OutOfQuotaException("积分已用完，请明日再试或充值后再试")
 
+    model_reference_images = await normalize_reference_urls(
+        reference_images, image_reference_max_side(aspect_ratio)
+    )
     gen_result = await image_generator.generate_image(
         prompt=prompt,
         model_name=model,
         aspect_ratio=aspect_ratio,
-        reference_image_list=reference_images,
+        reference_image_list=model_reference_images,
     )
     images_items = (gen_result or {}).get("images", []) or []
     usage_stats = (gen_result or {}).get("usage", {}) or {}
@@ -53,14 +57,14 @@ async def generate_and_save_image(
                 url = volc_tos_client.upload_object(VOLC_TOS_BUCKET, object_name, img_bytes)
                 uploaded_urls.append(url)
             except Exception as e:
-                logger.error(f"Upload base64 image failed: {e}")
+                logger.error("Upload base64 image failed: %s", e)
                 continue
         elif img_type == "url":
             try:
                 url = volc_tos_client.upload_url_content(VOLC_TOS_BUCKET, object_name, data)
                 uploaded_urls.append(url)
             except Exception as e:
-                logger.error(f"Upload url image failed: {e}")
+                logger.error("Upload url image failed: %s", e)
                 continue
 
     if not uploaded_urls:
@@ -0,0 +1,78 @@
+"""图片处理（Pillow）：CPU 密集，通过 process_pool 放在独立进程池执行，避免阻塞事件循环与任务线程。
+
+本模块的函数会在子进程中运行，只依赖 Pillow，不引入配置、日志、Supabase / TOS 等模块；进程池本身见 process_pool.py。
+"""
+import io
+from typing import Dict, Tuple
+
+_FORMAT_TO_MIME = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def format_to_mime(fmt: str) -> str:
+    return _FORMAT_TO_MIME.get((fmt or "").upper(), "application/octet-stream")
+
+
+def downscale_and_encode(
+    data: bytes,
+    max_side: int,
+    fmt: str = "JPEG",
+    quality: int = 90,
+) -> Tuple[bytes, str, int, int]:
+    """等比缩小到长边不超过 max_side（不放大），重新编码为 fmt。返回 (bytes, mime, width, height)。
+    fmt=JPEG 且原图带透明通道时改用 WEBP，避免透明区域变黑。"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        scale = min(1.0, max_side / float(max(width, height))) if max_side else 1.0
+        if scale < 1.0:
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+            img = img.resize((width, height), Image.LANCZOS)
+
+        fmt = (fmt or "JPEG").upper()
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if fmt == "JPEG" and has_alpha:
+            fmt = "WEBP"
+        if fmt == "JPEG":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if has_alpha else "RGB")
+
+        out = io.BytesIO()
+        save_kwargs = {"quality": quality}
+        if fmt == "JPEG":
+            save_kwargs.update(optimize=True, progressive=True)
+        elif fmt == "WEBP":
+            save_kwargs.update(method=4)
+        img.save(out, format=fmt, **save_kwargs)
+        return out.getvalue(), format_to_mime(fmt), width, height
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """只解析文件头获取宽高，不解码像素"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        return img.size
+
+
+def make_derivatives(data: bytes, sizes: Dict[str, int], fmt: str = "WEBP", quality: int = 80) -> Dict[str, bytes]:
+    """一次解码生成多个尺寸的衍生图：sizes 为 {名称: 长边像素}，返回 {名称: 编码后字节}。
+    按尺寸从大到小依次缩小，避免每个尺寸都从原图重采样。"""
+    from PIL import Image, ImageOps
+
+    result = {}
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        for name, max_side in sorted(sizes.items(), key=lambda kv: kv[1], reverse=True):
+            width, height = img.size
+            scale = min(1.0, max_side / float(max(width, height)))
+            if scale < 1.0:
+                img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format=fmt, quality=quality)
+            result[name] = out.getvalue()
+    return result
@@ -0,0 +1,53 @@
+"""线程安全的懒加载单例：重量级客户端（Supabase / TOS / OpenAI）在首次使用时才导入依赖并创建。
+
+LazySingleton 本身可直接当作实例使用（属性访问转发到真实实例），调用方无需修改；
+/health 等不依赖外部服务的接口不会触发创建，冷启动只需导入 FastAPI 与路由。
+"""
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_registry: List["LazySingleton"] = []
+
+
+class LazySingleton(Generic[T]):
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def get_instance(self) -> T:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def reset(self) -> None:
+        """丢弃已创建的实例，下次访问时按最新配置重新创建（配置热更新时使用）"""
+        with self._lock:
+            self._instance = None
+
+    def is_initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, item):
+        # 只有 LazySingleton 自身没有的属性才会走到这里
+        return getattr(self.get_instance(), item)
+
+    def __repr__(self) -> str:
+        state = "initialized" if self.is_initialized() else "lazy"
+        return f"<LazySingleton {self._name} ({state})>"
+
+
+def registered_singletons() -> List[LazySingleton]:
+    return list(_registry)
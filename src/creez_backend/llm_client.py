@@ -1,8 +1,18 @@
-from openai import AsyncOpenAI
+from config import DOUBAO_API_KEY, DOUBAO_BASE_URL, live_str
+from configmap_utils import config_provider
+from lazy import LazySingleton
 
-from config import DOUBAO_API_KEY, DOUBAO_BASE_URL
 
-async_doubao_client = AsyncOpenAI(
-    api_key=DOUBAO_API_KEY,
-    base_url=DOUBAO_BASE_URL,
-)
+def _create_async_doubao_client():
+    # openai 导入较慢（类型定义很多），延迟到首次调用 LLM 时
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=live_str("DOUBAO_API_KEY", DOUBAO_API_KEY, secret=True),
+        base_url=live_str("DOUBAO_BASE_URL", DOUBAO_BASE_URL),
+    )
+
+
+async_doubao_client = LazySingleton("doubao_llm", _create_async_doubao_client)
+# 接口地址 / API Key 在 configmap 或 secret 中变化时，下次调用按新配置重建客户端
+config_provider.subscribe(lambda _changes: async_doubao_client.reset(), keys=["DOUBAO_BASE_URL", "DOUBAO_API_KEY"])
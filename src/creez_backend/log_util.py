@@ -1,13 +1,188 @@
+"""日志：调用方只把记录放入内存队列，由后台 QueueListener 线程格式化并写 stdout，避免写日志阻塞事件循环。
+
+- 延迟格式化：记录保留 msg/args 原样入队，在监听线程中才拼接消息（调用处请用 logger.info("... %s", x)）
+- 结构化输出：LOG_FORMAT=json（默认）每行一个 JSON；LOG_FORMAT=text 为原先的文本格式
+- 截断：消息与异常堆栈超过 LOG_MAX_MESSAGE_CHARS 时保留首尾；base64 内容替换为长度说明
+- 采样：LOG_SAMPLING="logger[:子串]=比例,..."，只对 INFO 及以下生效，默认对 uvicorn.access 的轮询请求按 5% 采样
+- 队列满（LOG_QUEUE_SIZE）时丢弃记录并计数，不阻塞调用方
+
+环境变量由 config.py 统一加载（按 ConfigRole 选择 .env 文件）；本模块先于 config 导入，只读取进程环境变量。
+"""
+import atexit
+import json
 import logging
-from dotenv import load_dotenv
+import os
+import queue
+import random
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional, Tuple
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "uvicorn.access:/poll=0.05")
+
+_TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+_DATA_URL_RE = re.compile(r"(data:[\w/+.-]+;base64,)[A-Za-z0-9+/=]{64,}")
+_BARE_BASE64_RE = re.compile(r"[A-Za-z0-9+/]{512,}={0,2}")
+# LogRecord 的标准属性；其余属性视为 extra= 传入的结构化字段
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _redact_base64(text: str) -> str:
+    text = _DATA_URL_RE.sub(lambda m: f"{m.group(1)}<{len(m.group(0)) - len(m.group(1))} chars>", text)
+    return _BARE_BASE64_RE.sub(lambda m: f"<base64 {len(m.group(0))} chars>", text)
+
+
+def _shorten(text: str, limit: int = LOG_MAX_MESSAGE_CHARS) -> str:
+    text = _redact_base64(text)
+    if limit <= 0 or len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]} ...<{len(text) - 2 * half} chars omitted>... {text[-half:]}"
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(_TEXT_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _shorten(record.message)
+        return super().formatMessage(record)
+
+    def formatException(self, ei) -> str:
+        return _shorten(super().formatException(ei))
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": _shorten(record.getMessage()),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                payload[key] = value if isinstance(value, (int, float, bool, type(None))) else _shorten(str(value))
+        if record.exc_info:
+            payload["exc"] = _shorten(self.formatException(record.exc_info))
+        elif record.exc_text:
+            payload["exc"] = _shorten(record.exc_text)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _parse_sampling(spec: str) -> List[Tuple[str, Optional[str], float]]:
+    """"uvicorn.access:/poll=0.05,httpx=0.1" → [("uvicorn.access", "/poll", 0.05), ("httpx", None, 0.1)]"""
+    rules = []
+    for item in (spec or "").split(","):
+        name, sep, rate = item.strip().rpartition("=")
+        if not sep or not name:
+            continue
+        logger_name, _, substring = name.partition(":")
+        try:
+            rules.append((logger_name.strip(), substring or None, max(0.0, min(1.0, float(rate)))))
+        except ValueError:
+            continue
+    return rules
+
+
+class SamplingFilter(logging.Filter):
+    """按 logger 名前缀（可选再按消息/参数中的子串）对 INFO 及以下的记录采样；WARNING 及以上始终保留"""
+
+    def __init__(self, rules: List[Tuple[str, Optional[str], float]]):
+        super().__init__()
+        self.rules = rules
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for logger_name, substring, rate in self.rules:
+            if record.name != logger_name and not record.name.startswith(logger_name + "."):
+                continue
+            if substring is not None and not _record_contains(record, substring):
+                continue
+            return random.random() < rate
+        return True
+
+
+def _record_contains(record: logging.LogRecord, substring: str) -> bool:
+    # 不调用 getMessage()，避免为被丢弃的记录做格式化
+    if substring in str(record.msg):
+        return True
+    args = record.args if isinstance(record.args, tuple) else (record.args,)
+    return any(isinstance(a, str) and substring in a for a in args)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """入队时不格式化；队列满时丢弃并计数"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 监听线程与调用方在同一进程，记录可直接传递，格式化留给监听线程
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            return
+        if self.dropped:
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                notice = logging.LogRecord(
+                    __name__, logging.WARNING, __file__, 0, "Log queue full, dropped %d records", (dropped,), None
+                )
+                try:
+                    self.queue.put_nowait(notice)
+                except queue.Full:
+                    with self._dropped_lock:
+                        self.dropped += dropped
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=max(0, LOG_QUEUE_SIZE))
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(_parse_sampling(LOG_SAMPLING)))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # uvicorn 命令行启动时已给自己的 logger 配置了同步 handler，改为交给根 logger（走队列与采样）
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # 进程退出前把队列中剩余的记录写完
+    atexit.register(_listener.stop)
 
-load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()],
-)
+setup_logging()
 
 
 def get_logger(name=None):
@@ -1,42 +1,16 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-
-from log_util import get_logger
-from routers.image import router as image_router
-from routers.video import router as video_router
-
-logger = get_logger(__name__)
-
-app = FastAPI(title="Creez Backend", description="AI image/video generation for Creez")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(image_router)
-app.include_router(video_router)
-
-
-@app.get("/ping")
-async def ping():
-    return {"message": "pong"}
-
-
-@app.get("/health")
-async def health():
-    return {"status": "ok"}
+"""服务入口：python main.py 启动 uvicorn，应用定义在 app.py。
 
+媒体进程池的 worker（forkserver / spawn）启动时会以 __mp_main__ 重新执行本文件，
+因此这里不导入应用，worker 不会加载 .env、配置与日志线程。
+"""
 
 if __name__ == "__main__":
     import uvicorn
 
     uvicorn.run(
-        "main:app",
+        "app:app",
         host="0.0.0.0",
         port=8081,
         reload=True,
+        log_config=None,  # 日志由 log_util 统一配置（队列 + JSON）
     )
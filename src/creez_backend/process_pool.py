@@ -0,0 +1,52 @@
+"""媒体处理进程池：image_processing / video_processing 中 CPU 密集的函数在这里的子进程中执行。
+
+池大小与配置热更新只在服务进程中处理；worker 只导入被调用函数所在的模块（只依赖 Pillow / 标准库）。
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from config import MEDIA_PROCESS_WORKERS, live_int
+from configmap_utils import config_provider
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = live_int("MEDIA_PROCESS_WORKERS", MEDIA_PROCESS_WORKERS)
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    """服务进程内有事件循环、任务线程、日志队列等多个线程，默认的 fork 会把其他线程持有的锁原样复制进子进程，
+    子进程可能因此死锁；改用 forkserver（不支持时用 spawn）从干净的进程创建 worker"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=max(1, _pool_size), mp_context=_mp_context())
+    return _pool
+
+
+def _on_pool_size_changed(_changes) -> None:
+    """MEDIA_PROCESS_WORKERS 变化：换用新大小的进程池，旧池在已提交任务完成后退出"""
+    global _pool, _pool_size
+    size = live_int("MEDIA_PROCESS_WORKERS", MEDIA_PROCESS_WORKERS)
+    with _pool_lock:
+        if size == _pool_size:
+            return
+        old, _pool, _pool_size = _pool, None, size
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+config_provider.subscribe(_on_pool_size_changed, keys=["MEDIA_PROCESS_WORKERS"])
+
+
+async def run_in_process_pool(fn, *args):
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(get_process_pool(), fn, *args)
@@ -15,7 +15,7 @@ try:
     with open(_PROMPT_PATH, "r", encoding="utf-8") as f:
         _PROMPT_TEMPLATE = f.read()
 except Exception as e:
-    logger.warning(f"Failed to load prompt template: {e}")
+    logger.warning("Failed to load prompt template: %s", e)
 
 
 async def generate_scene_image_parameters(
@@ -76,14 +76,14 @@ async def generate_scene_image_parameters(
         )
         content = response.choices[0].message.content
     except Exception as e:
-        logger.error(f"LLM call failed: {e}")
+        logger.error("LLM call failed: %s", e)
         raise HTTPException(status_code=500, detail=f"生成提示词失败: {e}")
 
     json_str = content.strip().strip("```json").strip("```").strip()
     try:
         params = json.loads(json_str)
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse LLM response: {e}")
+        logger.error("Failed to parse LLM response: %s", e)
         raise HTTPException(status_code=500, detail="解析提示词失败")
 
     return {
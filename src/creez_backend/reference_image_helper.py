@@ -0,0 +1,194 @@
+"""参考图存储与预处理：
+- 按内容哈希存入 TOS，同一张图只上传一次，生成请求只携带短 reference_id
+- 提交给模型前按目标分辨率缩小、重新编码，结果按内容哈希缓存
+"""
+import asyncio
+import base64
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import httpx
+
+from config import (
+    REFERENCE_NORMALIZE_ENABLED,
+    REFERENCE_NORMALIZE_FORMAT,
+    REFERENCE_NORMALIZE_PASSTHROUGH_BYTES,
+    REFERENCE_NORMALIZE_QUALITY,
+    REFERENCE_OBJECT_PREFIX,
+    REFERENCE_UPLOAD_MAX_BYTES,
+    VOLC_TOS_BUCKET,
+)
+from image_processing import downscale_and_encode, image_size
+from log_util import get_logger
+from process_pool import run_in_process_pool
+from Storage.volc_tos import volc_tos_client
+from Tools.image_generator.doubao_4_0_image_generator import get_width_height
+
+logger = get_logger(__name__)
+
+_MIME_TO_EXT = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp",
+}
+# Seedance 以 720p 输出，首尾帧长边超过 1280 对画质无收益
+VIDEO_REFERENCE_MAX_SIDE = 1280
+_NORMALIZED_PREFIX = REFERENCE_OBJECT_PREFIX + "normalized/"
+_CACHE_MAX_ENTRIES = 512
+_REFERENCE_ID_RE = re.compile(r"^[0-9a-f]{64}\.[a-z]{3,4}$")
+
+
+def sniff_image_mime(content: bytes) -> Optional[str]:
+    """按文件头（magic bytes）识别图片格式，返回 image/xxx；不是支持的图片格式时返回 None"""
+    if content.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if content.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    if content[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if content.startswith(b"BM"):
+        return "image/bmp"
+    return None
+
+
+def save_reference_image(content: bytes, mime: str) -> Dict[str, str]:
+    """保存参考图，返回 {reference_id, url}。reference_id = sha256 + 扩展名，已存在则跳过上传"""
+    ext = _MIME_TO_EXT.get((mime or "").lower(), ".bin")
+    reference_id = f"{hashlib.sha256(content).hexdigest()}{ext}"
+    object_name = REFERENCE_OBJECT_PREFIX + reference_id
+    try:
+        exists = volc_tos_client.object_exists(VOLC_TOS_BUCKET, object_name)
+    except Exception as e:
+        logger.warning("Check reference object failed, uploading anyway: %s", e)
+        exists = False
+    if exists:
+        url = volc_tos_client.object_url(VOLC_TOS_BUCKET, object_name)
+    else:
+        url = volc_tos_client.upload_object(VOLC_TOS_BUCKET, object_name, content)
+    return {"reference_id": reference_id, "url": url}
+
+
+def reference_id_to_url(reference_id: str) -> str:
+    """reference_id 转为可供模型访问的 TOS URL；格式非法时抛 ValueError"""
+    reference_id = (reference_id or "").strip()
+    if not _REFERENCE_ID_RE.match(reference_id):
+        raise ValueError(f"Invalid reference_id: {reference_id}")
+    return volc_tos_client.object_url(VOLC_TOS_BUCKET, REFERENCE_OBJECT_PREFIX + reference_id)
+
+
+class _LRUCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+_normalized_cache = _LRUCache(_CACHE_MAX_ENTRIES)
+
+
+def image_reference_max_side(aspect_ratio: str) -> int:
+    """生图参考图的最大有效长边：与该宽高比的输出尺寸长边一致"""
+    return max(get_width_height(aspect_ratio))
+
+
+async def _load_reference_bytes(url: str) -> Optional[bytes]:
+    """读取参考图字节；远端下载与上传接口使用同一上限 REFERENCE_UPLOAD_MAX_BYTES，超出时抛 ValueError"""
+    if url.startswith("data:"):
+        _, _, b64 = url.partition(",")
+        return base64.b64decode(b64)
+    async with httpx.AsyncClient(timeout=60) as client:
+        async with client.stream("GET", url) as resp:
+            resp.raise_for_status()
+            content_length = resp.headers.get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > REFERENCE_UPLOAD_MAX_BYTES:
+                raise ValueError(f"Reference image too large: {content_length} B")
+            buf = bytearray()
+            async for chunk in resp.aiter_bytes():
+                buf.extend(chunk)
+                if len(buf) > REFERENCE_UPLOAD_MAX_BYTES:
+                    raise ValueError(f"Reference image too large: > {REFERENCE_UPLOAD_MAX_BYTES} B")
+            return bytes(buf)
+
+
+async def normalize_reference_url(url: str, max_side: int) -> str:
+    """将参考图（data URL 或 http URL）缩小到 max_side 并重新编码，上传 TOS 后返回新 URL。
+    尺寸与体积都未超限、或处理失败时原样返回。"""
+    if not REFERENCE_NORMALIZE_ENABLED or not url or not isinstance(url, str):
+        return url
+    if not url.startswith(("data:", "http://", "https://")):
+        return url
+    if url.startswith("http") and _NORMALIZED_PREFIX in url:
+        return url
+
+    raw = None
+    if url.startswith("data:"):
+        try:
+            raw = await _load_reference_bytes(url)
+        except Exception as e:
+            logger.warning("Invalid data URL reference, using original: %s", e)
+            return url
+        source_key = hashlib.sha256(raw).hexdigest()
+    else:
+        source_key = url
+    cache_key = f"{source_key}:{max_side}:{REFERENCE_NORMALIZE_FORMAT}:{REFERENCE_NORMALIZE_QUALITY}"
+    cached = _normalized_cache.get(cache_key)
+    if cached:
+        return cached
+
+    result = url
+    try:
+        if raw is None:
+            raw = await _load_reference_bytes(url)
+        width, height = image_size(raw)
+        if max(width, height) > max_side or len(raw) > REFERENCE_NORMALIZE_PASSTHROUGH_BYTES:
+            encoded, mime, new_w, new_h = await run_in_process_pool(
+                downscale_and_encode, raw, max_side, REFERENCE_NORMALIZE_FORMAT, REFERENCE_NORMALIZE_QUALITY
+            )
+            if len(encoded) < len(raw):
+                digest = hashlib.sha256(raw).hexdigest()
+                object_name = f"{_NORMALIZED_PREFIX}{digest}_{max_side}{_MIME_TO_EXT.get(mime, '.bin')}"
+                loop = asyncio.get_event_loop()
+                if await loop.run_in_executor(None, volc_tos_client.object_exists, VOLC_TOS_BUCKET, object_name):
+                    result = volc_tos_client.object_url(VOLC_TOS_BUCKET, object_name)
+                else:
+                    result = await loop.run_in_executor(
+                        None, volc_tos_client.upload_object, VOLC_TOS_BUCKET, object_name, encoded
+                    )
+                logger.info(
+                    "Normalized reference %sx%s (%s B) -> %sx%s (%s B)",
+                    width, height, len(raw), new_w, new_h, len(encoded),
+                )
+    except Exception as e:
+        logger.warning("Normalize reference image failed, using original: %s", e)
+        return url
+
+    _normalized_cache.put(cache_key, result)
+    return result
+
+
+async def normalize_reference_urls(urls: Optional[List[str]], max_side: int) -> Optional[List[str]]:
+    if not urls:
+        return urls
+    return list(await asyncio.gather(*(normalize_reference_url(u, max_side) for u in urls)))
@@ -1,15 +1,20 @@
 """图片生成、生成 prompt 接口"""
+import asyncio
+from functools import partial
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, HTTPException
 from pydantic import BaseModel
-from typing import Optional, List, Any
+from typing import Annotated, Optional, List, Any
 
+from config import IDEMPOTENCY_KEY_HEADER
+from exceptions.self_defined import IdempotencyStoreUnavailableException, QuotaExceededException
+from idempotency import idempotency_store
 from log_util import get_logger
 from middleware.auth import require_user_id
 from prompt_generator import generate_scene_image_parameters
-from task_runner import fire_and_forget_generate_image
+from responses import FastJSONResponse
+from task_runner import cancel_generation_task, fire_and_forget_generate_image, _extract_reference_urls
 from utils import poll_tasks_with_timeout_check
 
 logger = get_logger(__name__)
@@ -52,11 +57,11 @@ async def generate_prompt(
         )
         if not params.get("prompt"):
             raise HTTPException(status_code=500, detail="生成图片提示词失败")
-        return JSONResponse(content=params, status_code=200)
+        return FastJSONResponse(content=params, status_code=200)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"generate_prompt error: {e}")
+        logger.error("generate_prompt error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -67,29 +72,60 @@ class CreateImageRequest(BaseModel):
     reference_image_list: Optional[List[Any]] = []
     project_id: Optional[str] = "creez"
     chat_id: Optional[str] = ""
+    priority: Optional[str] = "interactive"  # interactive：交互单次生成；bulk：批量填充，排在交互请求之后
 
 
 @router.post("/async_generations")
 async def create_image_task(
     body: CreateImageRequest,
     user_id: str = Depends(require_user_id),
+    idempotency_key: Annotated[str | None, Header(alias=IDEMPOTENCY_KEY_HEADER)] = None,
 ):
-    """创建异步图片生成任务"""
+    """创建异步图片生成任务。携带 Idempotency-Key 时，重复提交返回已有 task_id，不再重复生成"""
     try:
-        task_id = str(uuid4())
-        fire_and_forget_generate_image(
-            task_id=task_id,
-            prompt=body.prompt,
-            model=body.model or "doubao-seedream-4-0",
-            aspect_ratio=body.aspect_ratio or "16:9",
-            reference_image_list=body.reference_image_list or [],
-            user_id=user_id,
-            project_id=body.project_id or "creez",
-            chat_id=body.chat_id or "",
+        _extract_reference_urls(body.reference_image_list or [])
+    except ValueError as e:
+        # reference_id 格式非法属于客户端错误，提交前校验，避免任务排队后才失败
+        raise HTTPException(status_code=400, detail=str(e))
+    task_id = str(uuid4())
+    loop = asyncio.get_event_loop()
+    if idempotency_key and idempotency_key.strip():
+        try:
+            task_id, created = await loop.run_in_executor(
+                None, idempotency_store.claim, "images", user_id, idempotency_key, task_id
+            )
+        except IdempotencyStoreUnavailableException as e:
+            logger.error("create_image_task idempotency unavailable for user %s: %s", user_id, e)
+            raise HTTPException(status_code=503, detail=str(e))
+        if not created:
+            return FastJSONResponse(content={"task_id": task_id}, status_code=200)
+    try:
+        # 准入与写入任务行会同步访问 Supabase，放到线程池执行，不阻塞事件循环
+        await loop.run_in_executor(
+            None,
+            partial(
+                fire_and_forget_generate_image,
+                task_id=task_id,
+                prompt=body.prompt,
+                model=body.model or "doubao-seedream-4-0",
+                aspect_ratio=body.aspect_ratio or "16:9",
+                reference_image_list=body.reference_image_list or [],
+                user_id=user_id,
+                project_id=body.project_id or "creez",
+                chat_id=body.chat_id or "",
+                priority=body.priority or "interactive",
+            ),
         )
-        return JSONResponse(content={"task_id": task_id}, status_code=200)
+        return FastJSONResponse(content={"task_id": task_id}, status_code=200)
+    except QuotaExceededException as e:
+        logger.warning("create_image_task rejected for user %s: %s", user_id, e)
+        if idempotency_key and idempotency_key.strip():
+            await loop.run_in_executor(None, idempotency_store.release, "images", user_id, idempotency_key, task_id)
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
-        logger.error(f"create_image_task error: {e}")
+        logger.error("create_image_task error: %s", e)
+        if idempotency_key and idempotency_key.strip():
+            await loop.run_in_executor(None, idempotency_store.release, "images", user_id, idempotency_key, task_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -103,14 +139,37 @@ async def poll_images(body: PollImagesRequest):
     try:
         task_ids = body.task_ids or []
         if not task_ids:
-            return JSONResponse(content={"data": {}}, status_code=200)
+            return FastJSONResponse(content={"data": {}}, status_code=200)
         result = poll_tasks_with_timeout_check(
             task_ids=task_ids,
             table_name="image_tasks",
             url_field_name="image_urls",
             timeout_minutes=10,
         )
-        return JSONResponse(content={"data": result}, status_code=200)
+        return FastJSONResponse(content={"data": result}, status_code=200)
+    except Exception as e:
+        logger.error("poll_images error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class CancelImagesRequest(BaseModel):
+    task_ids: List[str]
+
+
+@router.post("/cancel")
+async def cancel_images(
+    body: CancelImagesRequest,
+    user_id: str = Depends(require_user_id),
+):
+    """取消排队中/执行中的图片任务，返回每个任务的结果：cancelled / not_found / forbidden"""
+    try:
+        loop = asyncio.get_event_loop()
+        result = {}
+        for task_id in body.task_ids or []:
+            # 标记 cancelled 会同步访问 Supabase，放到线程池执行
+            status = await loop.run_in_executor(None, cancel_generation_task, "image_tasks", task_id, user_id)
+            result[task_id] = {"task_id": task_id, "status": status}
+        return FastJSONResponse(content={"data": result}, status_code=200)
     except Exception as e:
-        logger.error(f"poll_images error: {e}")
+        logger.error("cancel_images error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
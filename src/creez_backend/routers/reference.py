@@ -0,0 +1,46 @@
+"""参考图上传接口：请求体为图片二进制（非 JSON/base64），流式读取后存入 TOS"""
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from config import REFERENCE_UPLOAD_MAX_BYTES
+from log_util import get_logger
+from middleware.auth import require_user_id
+from reference_image_helper import save_reference_image, sniff_image_mime
+from responses import FastJSONResponse
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/creez/references", tags=["creez-reference"])
+
+
+@router.post("/upload")
+async def upload_reference(
+    request: Request,
+    user_id: str = Depends(require_user_id),
+):
+    """上传参考图：body 为原始字节，Content-Type 可为 image/png、image/jpeg、application/octet-stream 等。
+    实际格式按文件头识别，不信任客户端声明的 Content-Type；非图片内容返回 415。
+    返回 {reference_id, url}，生成接口的 reference_image_list / frames 中可传 { reference_id } 或 { url }"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > REFERENCE_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Reference image too large")
+
+    buf = bytearray()
+    async for chunk in request.stream():
+        buf.extend(chunk)
+        if len(buf) > REFERENCE_UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Reference image too large")
+    if not buf:
+        raise HTTPException(status_code=400, detail="Empty body")
+    mime = sniff_image_mime(bytes(buf[:16]))
+    if not mime:
+        raise HTTPException(status_code=415, detail="Body is not a supported image")
+
+    try:
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(None, save_reference_image, bytes(buf), mime)
+        return FastJSONResponse(content=result, status_code=200)
+    except Exception as e:
+        logger.error("upload_reference error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,14 +1,19 @@
 """视频生成接口"""
+import asyncio
+from functools import partial
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, HTTPException
 from pydantic import BaseModel
-from typing import Optional, List, Any
+from typing import Annotated, Optional, List, Any
 
+from config import IDEMPOTENCY_KEY_HEADER
+from exceptions.self_defined import IdempotencyStoreUnavailableException, QuotaExceededException
+from idempotency import idempotency_store
 from log_util import get_logger
 from middleware.auth import require_user_id
-from task_runner import fire_and_forget_generate_video, _extract_reference_urls
+from responses import FastJSONResponse
+from task_runner import cancel_generation_task, fire_and_forget_generate_video, _extract_reference_urls
 from utils import poll_tasks_with_timeout_check
 
 logger = get_logger(__name__)
@@ -25,36 +30,66 @@ class CreateVideoRequest(BaseModel):
     generate_audio: Optional[bool] = False
     project_id: Optional[str] = "creez"
     chat_id: Optional[str] = ""
+    priority: Optional[str] = "interactive"  # interactive：交互单次生成；bulk：批量填充，排在交互请求之后
 
 
 @router.post("/async_generations")
 async def create_video_task(
     body: CreateVideoRequest,
     user_id: str = Depends(require_user_id),
+    idempotency_key: Annotated[str | None, Header(alias=IDEMPOTENCY_KEY_HEADER)] = None,
 ):
-    """创建异步视频生成任务。frames 格式同 image 的 reference_image_list：{ type: "base64", data } 或 { url }。frames[0]=首帧，frames[1]=尾帧。"""
+    """创建异步视频生成任务。frames 格式同 image 的 reference_image_list：{ type: "base64", data } 或 { url }。frames[0]=首帧，frames[1]=尾帧。
+    携带 Idempotency-Key 时，重复提交返回已有 task_id，不再重复生成。"""
+    try:
+        extracted = _extract_reference_urls(body.frames or [])
+    except ValueError as e:
+        # reference_id 格式非法属于客户端错误
+        raise HTTPException(status_code=400, detail=str(e))
+    task_id = str(uuid4())
+    loop = asyncio.get_event_loop()
+    if idempotency_key and idempotency_key.strip():
+        try:
+            task_id, created = await loop.run_in_executor(
+                None, idempotency_store.claim, "videos", user_id, idempotency_key, task_id
+            )
+        except IdempotencyStoreUnavailableException as e:
+            logger.error("create_video_task idempotency unavailable for user %s: %s", user_id, e)
+            raise HTTPException(status_code=503, detail=str(e))
+        if not created:
+            return FastJSONResponse(content={"task_id": task_id}, status_code=200)
     try:
-        task_id = str(uuid4())
-        raw_frames = body.frames or []
-        extracted = _extract_reference_urls(raw_frames)
         first_frame_image = extracted[0] if len(extracted) > 0 else None
         last_frame_image = extracted[1] if len(extracted) > 1 else None
-        fire_and_forget_generate_video(
-            task_id=task_id,
-            prompt=body.prompt,
-            first_frame_image=first_frame_image,
-            last_frame_image=last_frame_image,
-            model=body.model or "doubao-seedance-pro",
-            duration=body.duration or 5,
-            aspect_ratio=body.aspect_ratio or "16:9",
-            generate_audio=body.generate_audio or False,
-            user_id=user_id,
-            project_id=body.project_id or "creez",
-            chat_id=body.chat_id or "",
+        # 准入与写入任务行会同步访问 Supabase，放到线程池执行，不阻塞事件循环
+        await loop.run_in_executor(
+            None,
+            partial(
+                fire_and_forget_generate_video,
+                task_id=task_id,
+                prompt=body.prompt,
+                first_frame_image=first_frame_image,
+                last_frame_image=last_frame_image,
+                model=body.model or "doubao-seedance-pro",
+                duration=body.duration or 5,
+                aspect_ratio=body.aspect_ratio or "16:9",
+                generate_audio=body.generate_audio or False,
+                user_id=user_id,
+                project_id=body.project_id or "creez",
+                chat_id=body.chat_id or "",
+                priority=body.priority or "interactive",
+            ),
         )
-        return JSONResponse(content={"task_id": task_id}, status_code=200)
+        return FastJSONResponse(content={"task_id": task_id}, status_code=200)
+    except QuotaExceededException as e:
+        logger.warning("create_video_task rejected for user %s: %s", user_id, e)
+        if idempotency_key and idempotency_key.strip():
+            await loop.run_in_executor(None, idempotency_store.release, "videos", user_id, idempotency_key, task_id)
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
-        logger.error(f"create_video_task error: {e}")
+        logger.error("create_video_task error: %s", e)
+        if idempotency_key and idempotency_key.strip():
+            await loop.run_in_executor(None, idempotency_store.release, "videos", user_id, idempotency_key, task_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -68,14 +103,37 @@ async def poll_videos(body: PollVideosRequest):
     try:
         task_ids = body.task_ids or []
         if not task_ids:
-            return JSONResponse(content={"data": {}}, status_code=200)
+            return FastJSONResponse(content={"data": {}}, status_code=200)
         result = poll_tasks_with_timeout_check(
             task_ids=task_ids,
             table_name="video_tasks",
             url_field_name="video_urls",
             timeout_minutes=30,
         )
-        return JSONResponse(content={"data": result}, status_code=200)
+        return FastJSONResponse(content={"data": result}, status_code=200)
+    except Exception as e:
+        logger.error("poll_videos error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class CancelVideosRequest(BaseModel):
+    task_ids: List[str]
+
+
+@router.post("/cancel")
+async def cancel_videos(
+    body: CancelVideosRequest,
+    user_id: str = Depends(require_user_id),
+):
+    """取消排队中/执行中的视频任务，返回每个任务的结果：cancelled / not_found / forbidden"""
+    try:
+        loop = asyncio.get_event_loop()
+        result = {}
+        for task_id in body.task_ids or []:
+            # 标记 cancelled 会同步访问 Supabase，放到线程池执行
+            status = await loop.run_in_executor(None, cancel_generation_task, "video_tasks", task_id, user_id)
+            result[task_id] = {"task_id": task_id, "status": status}
+        return FastJSONResponse(content={"data": result}, status_code=200)
     except Exception as e:
-        logger.error(f"poll_videos error: {e}")
+        logger.error("cancel_videos error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,58 @@
+"""热点表的轻量行模型：__slots__ 声明的字段即查询投影的列，只传输、只保存需要的字段。
+
+用法：supabase_client.select(table, filters, row_model=UserBalanceRow) 返回 UserBalanceRow 列表。
+"""
+from typing import Any, Dict, List, Optional, Type
+
+
+class Row:
+    __slots__ = ()
+
+    @classmethod
+    def columns(cls) -> List[str]:
+        return list(cls.__slots__)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Row":
+        obj = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(obj, name, data.get(name))
+        return obj
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class ImageTaskRow(Row):
+    """image_tasks 轮询所需字段"""
+
+    __slots__ = ("task_id", "status", "image_urls", "message", "derivatives", "created_at")
+
+
+class VideoTaskRow(Row):
+    """video_tasks 轮询所需字段"""
+
+    __slots__ = ("task_id", "status", "video_urls", "message", "derivatives", "created_at")
+
+
+class UserBalanceRow(Row):
+    """user_balance 余额检查 / 扣费所需字段"""
+
+    __slots__ = ("id", "balance", "granted_credits")
+
+
+ROW_MODELS: Dict[str, Type[Row]] = {
+    "image_tasks": ImageTaskRow,
+    "video_tasks": VideoTaskRow,
+    "user_balance": UserBalanceRow,
+}
+
+
+def table_columns(table: str) -> Optional[List[str]]:
+    """表的声明投影列；未声明的表返回 None（查询 *）"""
+    model = ROW_MODELS.get(table)
+    return model.columns() if model else None
@@ -0,0 +1,326 @@
+"""生成任务调度：限制并发，按优先级 + 用户公平排队，避免单个用户的大批量任务饿死其他用户。
+
+- 优先级：interactive（单张重生成等交互请求）严格优先于 bulk（批量填充故事板）
+- bulk 最多占用 bulk_max_workers 个并发槽位，始终为 interactive 预留容量
+- 同一优先级内按用户做公平排队（start-time fair queuing）：每个用户的任务按虚拟完成时间排序，
+  大批量提交的用户只会排在自己的任务之后，不会挡住其他用户；已达执行上限的用户整体跳过
+- 并发配额：每个 user_id / project_id 同时执行的任务数超过 *_max_running 时继续排队；
+  排队 + 执行中的任务数超过 *_max_inflight 时，reserve() 抛 QuotaExceededException，由接口层拒绝
+"""
+import heapq
+import itertools
+import threading
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from exceptions.self_defined import QuotaExceededException
+from log_util import get_logger
+
+logger = get_logger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+# 客户端未传 project_id 时的默认值，所有用户共用，不做项目级配额：
+# skill 脚本缺省传 "creez"，Electron 客户端（main.js toUuidForBackend）把 "creez" 映射为固定 UUID
+DEFAULT_PROJECT_IDS = frozenset({"creez", "00000000-0000-0000-0000-000000000001"})
+
+
+def normalize_priority(priority: Optional[str]) -> str:
+    return priority if priority in PRIORITIES else PRIORITY_INTERACTIVE
+
+
+class Reservation:
+    """reserve() 返回的占位：submit() 时带上；任务未能提交时调用 scheduler.release()"""
+
+    __slots__ = ("user_id", "project_id", "released")
+
+    def __init__(self, user_id: str, project_id: str):
+        self.user_id = user_id
+        self.project_id = project_id
+        self.released = False
+
+
+class _Job:
+    __slots__ = ("fn", "reservation", "priority")
+
+    def __init__(self, fn: Callable[[], None], reservation: Reservation, priority: str):
+        self.fn = fn
+        self.reservation = reservation
+        self.priority = priority
+
+
+class _FairQueue:
+    """单个优先级的公平队列：每个用户一条 FIFO 子队列，用户之间按队首任务的虚拟完成时间排序。
+
+    已达执行上限的用户整体移出候选堆（parked），直到其执行中的任务结束再放回，
+    调度时不必逐个弹出、放回该用户排队的任务。"""
+
+    def __init__(self):
+        self.users: Dict[str, Deque[Tuple[float, int, float, _Job]]] = {}
+        self.heap: List[Tuple[float, int, str]] = []  # 每个未 park 且有排队任务的用户一项：(队首 finish, 队首 seq, user_id)
+        self.parked: Set[str] = set()
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self.size = 0
+
+    def push(self, seq: int, user_id: str, job: _Job) -> None:
+        start = max(self.virtual_time, self.last_finish.get(user_id, 0.0))
+        finish = start + 1.0
+        self.last_finish[user_id] = finish
+        jobs = self.users.get(user_id)
+        if jobs is None:
+            jobs = self.users[user_id] = deque()
+        jobs.append((finish, seq, start, job))
+        self.size += 1
+        if len(jobs) == 1 and user_id not in self.parked:
+            heapq.heappush(self.heap, (finish, seq, user_id))
+
+    def unpark(self, user_id: str) -> None:
+        """用户执行中的任务减少（或配额放宽）后放回候选堆"""
+        if user_id not in self.parked:
+            return
+        self.parked.discard(user_id)
+        jobs = self.users.get(user_id)
+        if jobs:
+            heapq.heappush(self.heap, (jobs[0][0], jobs[0][1], user_id))
+
+    def unpark_all(self) -> None:
+        for user_id in list(self.parked):
+            self.unpark(user_id)
+
+    def remove(self, user_id: str, job: _Job) -> bool:
+        """从排队中移除 job（任务取消）；job 已被取出执行时返回 False"""
+        jobs = self.users.get(user_id)
+        index = next((i for i, item in enumerate(jobs) if item[3] is job), None) if jobs else None
+        if index is None:
+            return False
+        head = jobs[0]
+        del jobs[index]
+        self.size -= 1
+        if index == 0 and user_id not in self.parked:
+            # 队首变化：更新该用户在候选堆中的项
+            self.heap.remove((head[0], head[1], user_id))
+            if jobs:
+                self.heap.append((jobs[0][0], jobs[0][1], user_id))
+            heapq.heapify(self.heap)
+        if not jobs:
+            del self.users[user_id]
+        if not self.size:
+            self.virtual_time = 0.0
+            self.last_finish.clear()
+            self.parked.clear()
+        return True
+
+    def pop_first(
+        self,
+        user_blocked: Callable[[str], bool],
+        eligible: Callable[[_Job], bool],
+    ) -> Optional[_Job]:
+        """按虚拟完成时间顺序取第一个可执行的任务。
+        user_blocked 为真的用户被 park；其余用户取子队列中第一个满足 eligible（项目配额）的任务，
+        都不满足的用户暂时跳过，取到任务后放回"""
+        skipped = []
+        picked = None
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            user_id = entry[2]
+            if user_blocked(user_id):
+                self.parked.add(user_id)
+                continue
+            jobs = self.users[user_id]
+            index = next((i for i, item in enumerate(jobs) if eligible(item[3])), None)
+            if index is None:
+                skipped.append(entry)
+                continue
+            picked = jobs[index]
+            del jobs[index]
+            if jobs:
+                heapq.heappush(self.heap, (jobs[0][0], jobs[0][1], user_id))
+            else:
+                del self.users[user_id]
+            break
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        if picked is None:
+            return None
+        self.size -= 1
+        self.virtual_time = max(self.virtual_time, picked[2])
+        if not self.size:
+            # 队列清空后重置，避免虚拟时间与历史记录无限增长
+            self.virtual_time = 0.0
+            self.last_finish.clear()
+            self.parked.clear()
+        return picked[3]
+
+    def __len__(self):
+        return self.size
+
+
+class GenerationScheduler:
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        bulk_max_workers: int,
+        user_max_running: int = 0,
+        user_max_inflight: int = 0,
+        project_max_running: int = 0,
+        project_max_inflight: int = 0,
+    ):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.bulk_max_workers = max(1, min(bulk_max_workers, self.max_workers))
+        self.user_max_running = user_max_running
+        self.user_max_inflight = user_max_inflight
+        self.project_max_running = project_max_running
+        self.project_max_inflight = project_max_inflight
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._queues: Dict[str, _FairQueue] = {p: _FairQueue() for p in PRIORITIES}
+        self._running: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._user_running: Dict[str, int] = defaultdict(int)
+        self._user_inflight: Dict[str, int] = defaultdict(int)
+        self._project_running: Dict[str, int] = defaultdict(int)
+        self._project_inflight: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def _project_key(project_id: str) -> str:
+        return "" if not project_id or project_id in DEFAULT_PROJECT_IDS else project_id
+
+    def reserve(self, user_id: str = "", project_id: str = "") -> Reservation:
+        """准入检查并占用 in-flight 配额；超限抛 QuotaExceededException"""
+        user_id = user_id or ""
+        project_key = self._project_key(project_id)
+        with self._lock:
+            if user_id and self.user_max_inflight and self._user_inflight[user_id] >= self.user_max_inflight:
+                raise QuotaExceededException(
+                    f"当前用户进行中的{self.name}任务已达上限（{self.user_max_inflight}），请等待已有任务完成后再提交"
+                )
+            if project_key and self.project_max_inflight and self._project_inflight[project_key] >= self.project_max_inflight:
+                raise QuotaExceededException(
+                    f"当前项目进行中的{self.name}任务已达上限（{self.project_max_inflight}），请等待已有任务完成后再提交"
+                )
+            if user_id:
+                self._user_inflight[user_id] += 1
+            if project_key:
+                self._project_inflight[project_key] += 1
+        return Reservation(user_id, project_key)
+
+    def release(self, reservation: Reservation) -> None:
+        """归还 in-flight 配额（任务结束或未能提交时）"""
+        with self._lock:
+            self._release_locked(reservation)
+
+    def _release_locked(self, reservation: Reservation) -> None:
+        if reservation.released:
+            return
+        reservation.released = True
+        _decrement(self._user_inflight, reservation.user_id)
+        _decrement(self._project_inflight, reservation.project_id)
+
+    def submit(
+        self,
+        job: Callable[[], None],
+        reservation: Optional[Reservation] = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> _Job:
+        """排队执行 job（在独立线程中运行）；有空闲槽位且未超出配额时立即开始。返回的对象可传给 cancel()"""
+        priority = normalize_priority(priority)
+        reservation = reservation or self.reserve()
+        queued = _Job(job, reservation, priority)
+        with self._lock:
+            self._queues[priority].push(next(self._seq), reservation.user_id, queued)
+            self._dispatch_locked()
+        return queued
+
+    def cancel(self, job: _Job) -> bool:
+        """取消仍在排队的 job：移出队列并立即归还 in-flight 配额；已开始执行时返回 False（由任务自行结束）"""
+        with self._lock:
+            if not self._queues[job.priority].remove(job.reservation.user_id, job):
+                return False
+            self._release_locked(job.reservation)
+        return True
+
+    def configure(self, **limits: int) -> None:
+        """运行时调整并发上限与配额（配置热更新）；已在执行的任务不受影响，放宽后立即调度排队任务"""
+        with self._lock:
+            if "max_workers" in limits:
+                self.max_workers = max(1, limits["max_workers"])
+            if "bulk_max_workers" in limits:
+                self.bulk_max_workers = limits["bulk_max_workers"]
+            self.bulk_max_workers = max(1, min(self.bulk_max_workers, self.max_workers))
+            for name in ("user_max_running", "user_max_inflight", "project_max_running", "project_max_inflight"):
+                if name in limits:
+                    setattr(self, name, limits[name])
+            for queue in self._queues.values():
+                queue.unpark_all()
+            self._dispatch_locked()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                p: {"queued": len(self._queues[p]), "running": self._running[p]}
+                for p in PRIORITIES
+            }
+
+    def _user_blocked_locked(self, user_id: str) -> bool:
+        return bool(user_id and self.user_max_running and self._user_running[user_id] >= self.user_max_running)
+
+    def _eligible_locked(self, job: _Job) -> bool:
+        r = job.reservation
+        if r.project_id and self.project_max_running and self._project_running[r.project_id] >= self.project_max_running:
+            return False
+        return True
+
+    def _next_locked(self) -> Optional[_Job]:
+        if sum(self._running.values()) >= self.max_workers:
+            return None
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            if priority == PRIORITY_BULK and self._running[PRIORITY_BULK] >= self.bulk_max_workers:
+                continue
+            job = queue.pop_first(self._user_blocked_locked, self._eligible_locked)
+            if job is not None:
+                return job
+        return None
+
+    def _dispatch_locked(self) -> None:
+        while True:
+            job = self._next_locked()
+            if job is None:
+                return
+            r = job.reservation
+            self._running[job.priority] += 1
+            if r.user_id:
+                self._user_running[r.user_id] += 1
+            if r.project_id:
+                self._project_running[r.project_id] += 1
+            t = threading.Thread(target=self._run, args=(job,), daemon=False)
+            t.start()
+
+    def _run(self, job: _Job) -> None:
+        try:
+            job.fn()
+        except Exception as e:
+            logger.error("%s scheduler job error: %s", self.name, e)
+        finally:
+            r = job.reservation
+            with self._lock:
+                self._running[job.priority] -= 1
+                _decrement(self._user_running, r.user_id)
+                _decrement(self._project_running, r.project_id)
+                self._release_locked(r)
+                for queue in self._queues.values():
+                    queue.unpark(r.user_id)
+                self._dispatch_locked()
+
+
+def _decrement(counter: Dict[str, int], key: str) -> None:
+    if not key:
+        return
+    counter[key] -= 1
+    if counter[key] <= 0:
+        counter.pop(key, None)
@@ -0,0 +1,104 @@
+"""启动与就绪分离：/health 只表示进程存活，不触发任何外部客户端；
+/ready 表示懒加载客户端已创建成功（或未开启预热、将在首个请求时创建），可以接收生成请求（K8s readinessProbe 使用）。
+
+启动后在后台线程中预热（导入 SDK、创建客户端），不阻塞 uvicorn 开始监听。
+"""
+import threading
+import time
+from typing import Dict
+
+from lazy import registered_singletons
+from log_util import get_logger
+
+logger = get_logger(__name__)
+
+_lock = threading.Lock()
+_errors: Dict[str, str] = {}
+_warmup_thread = None
+_warmup_seconds = None
+
+
+def _import_singletons() -> None:
+    # 导入定义懒加载单例的模块，使其注册到 lazy 的注册表（只导入模块，不创建客户端）
+    import llm_client  # noqa: F401
+    import supabase_client  # noqa: F401
+    from Storage import volc_tos  # noqa: F401
+
+
+def warm_up() -> Dict[str, str]:
+    """同步创建所有懒加载单例，返回 {名称: 错误信息}（成功为空）"""
+    global _warmup_seconds
+    _import_singletons()
+    start = time.perf_counter()
+    errors = {}
+    for singleton in registered_singletons():
+        try:
+            singleton.get_instance()
+        except Exception as e:
+            logger.error("Warm up %s failed: %s", singleton.name, e)
+            errors[singleton.name] = str(e)
+    with _lock:
+        _errors.clear()
+        _errors.update(errors)
+        _warmup_seconds = time.perf_counter() - start
+    logger.info("Warm up finished in %.3fs, errors: %s", _warmup_seconds, list(errors))
+    return errors
+
+
+def start_background_warm_up() -> None:
+    global _warmup_thread
+    with _lock:
+        if _warmup_thread is not None:
+            return
+        _warmup_thread = threading.Thread(target=warm_up, name="startup-warm-up", daemon=True)
+        _warmup_thread.start()
+
+
+def _warm_up_running() -> bool:
+    with _lock:
+        return _warmup_thread is not None and _warmup_thread.is_alive()
+
+
+def _retry(singleton) -> bool:
+    """预热失败或配置热更新后被 reset 的单例：就绪检查时重试创建，成功后清除错误"""
+    try:
+        singleton.get_instance()
+    except Exception as e:
+        logger.error("Retry creating %s failed: %s", singleton.name, e)
+        with _lock:
+            _errors[singleton.name] = str(e)
+        return False
+    with _lock:
+        _errors.pop(singleton.name, None)
+    return True
+
+
+def readiness(warmup_enabled: bool = True) -> Dict:
+    """各单例的创建状态；全部可用时 ready=True。可能同步创建客户端，接口中需通过 run_in_executor 调用。
+
+    - 预热进行中：尚未创建的单例为 pending
+    - 预热已结束：尚未创建的单例（预热失败或被 reset）就地重试创建，不会因一次失败一直 503
+    - 未开启预热：尚未创建的单例记为 lazy（首个请求时创建），视为就绪
+    """
+    _import_singletons()
+    warming_up = warmup_enabled and _warm_up_running()
+    components = {}
+    for singleton in registered_singletons():
+        if singleton.is_initialized():
+            components[singleton.name] = "ok"
+        elif not warmup_enabled:
+            components[singleton.name] = "lazy"
+        elif warming_up:
+            components[singleton.name] = "pending"
+        elif _retry(singleton):
+            components[singleton.name] = "ok"
+        else:
+            with _lock:
+                components[singleton.name] = f"error: {_errors.get(singleton.name, '')}"
+    with _lock:
+        warmup_seconds = _warmup_seconds
+    return {
+        "ready": all(v in ("ok", "lazy") for v in components.values()),
+        "components": components,
+        "warmup_seconds": warmup_seconds,
+    }
@@ -1,12 +1,15 @@
-from typing import Any, Dict, List, Optional
-
-from supabase import Client, create_client
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type
 
 from config import SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
+from lazy import LazySingleton
 from log_util import get_logger
+from row_models import Row
 
 logger = get_logger(__name__)
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 # 未配置时直接报错，便于发现原因（检查 .env 中 NEXT_PUBLIC_SUPABASE_URL / NEXT_PUBLIC_SUPABASE_ANON_KEY / SUPABASE_SERVICE_ROLE_KEY）
 def _require_supabase_config():
     url = (SUPABASE_URL or "").strip()
@@ -25,8 +28,10 @@ def _require_supabase_config():
 
 class SupabaseClient:
     def __init__(self, url: str, key: str, role_key: str):
-        self.client: Client = create_client(url, key)
-        self.auth_client: Client = create_client(url, role_key or key)
+        from supabase import create_client
+
+        self.client: "Client" = create_client(url, key)
+        self.auth_client: "Client" = create_client(url, role_key or key)
 
     def insert(
         self, table: str, data: Dict[str, Any] | List[Dict[str, Any]]
@@ -41,7 +46,12 @@ class SupabaseClient:
         columns: Optional[List[str]] = None,
         order_by: Optional[str] = None,
         order_desc: bool = False,
+        row_model: Optional[Type[Row]] = None,
+        limit: Optional[int] = None,
     ) -> Any:
+        """row_model 不为空时只查询其声明的列（columns 未指定时），并返回 row_model 实例列表"""
+        if row_model is not None and not columns:
+            columns = row_model.columns()
         if columns:
             query = self.client.table(table).select(",".join(columns))
         else:
@@ -58,7 +68,11 @@ class SupabaseClient:
                     query = query.eq(k, v)
         if order_by:
             query = query.order(order_by, desc=order_desc)
+        if limit:
+            query = query.limit(limit)
         response = query.execute()
+        if row_model is not None:
+            return [row_model.from_dict(row) for row in response.data]
         return response.data
 
     def update(
@@ -87,5 +101,9 @@ class SupabaseClient:
         return response.data
 
 
-_url, _key, _role_key = _require_supabase_config()
-supabase_client = SupabaseClient(_url, _key, _role_key)
+def _create_supabase_client() -> SupabaseClient:
+    return SupabaseClient(*_require_supabase_config())
+
+
+# 首次访问属性时才导入 supabase 并建立客户端（未配置时在首次使用 / 就绪检查时报错）
+supabase_client: SupabaseClient = LazySingleton("supabase", _create_supabase_client)
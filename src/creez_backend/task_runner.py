@@ -1,18 +1,192 @@
 """后台任务执行：图片/视频生成，结果写入 Supabase"""
 import asyncio
 import threading
+from typing import Dict
 from uuid import uuid4
 
+from config import (
+    IMAGE_BULK_MAX_CONCURRENT_TASKS,
+    IMAGE_MAX_CONCURRENT_TASKS,
+    IMAGE_PROJECT_MAX_INFLIGHT,
+    IMAGE_PROJECT_MAX_RUNNING,
+    IMAGE_USER_MAX_INFLIGHT,
+    IMAGE_USER_MAX_RUNNING,
+    VIDEO_BULK_MAX_CONCURRENT_TASKS,
+    VIDEO_MAX_CONCURRENT_TASKS,
+    VIDEO_PROJECT_MAX_INFLIGHT,
+    VIDEO_PROJECT_MAX_RUNNING,
+    VIDEO_USER_MAX_INFLIGHT,
+    VIDEO_USER_MAX_RUNNING,
+    live_int,
+)
+from configmap_utils import config_provider
 from exceptions.self_defined import OutOfQuotaException
 from log_util import get_logger
+from scheduler import PRIORITY_INTERACTIVE, GenerationScheduler
 import token_usage_utils
 from supabase_client import supabase_client
 
 logger = get_logger(__name__)
 
+image_scheduler = GenerationScheduler(
+    "图片",
+    IMAGE_MAX_CONCURRENT_TASKS,
+    IMAGE_BULK_MAX_CONCURRENT_TASKS,
+    user_max_running=IMAGE_USER_MAX_RUNNING,
+    user_max_inflight=IMAGE_USER_MAX_INFLIGHT,
+    project_max_running=IMAGE_PROJECT_MAX_RUNNING,
+    project_max_inflight=IMAGE_PROJECT_MAX_INFLIGHT,
+)
+video_scheduler = GenerationScheduler(
+    "视频",
+    VIDEO_MAX_CONCURRENT_TASKS,
+    VIDEO_BULK_MAX_CONCURRENT_TASKS,
+    user_max_running=VIDEO_USER_MAX_RUNNING,
+    user_max_inflight=VIDEO_USER_MAX_INFLIGHT,
+    project_max_running=VIDEO_PROJECT_MAX_RUNNING,
+    project_max_inflight=VIDEO_PROJECT_MAX_INFLIGHT,
+)
+
+# configmap 中的同名 key 覆盖 .env 的默认值；变化时调整调度器，无需重启
+_SCHEDULER_LIMIT_KEYS = {
+    image_scheduler: {
+        "max_workers": ("IMAGE_MAX_CONCURRENT_TASKS", IMAGE_MAX_CONCURRENT_TASKS),
+        "bulk_max_workers": ("IMAGE_BULK_MAX_CONCURRENT_TASKS", IMAGE_BULK_MAX_CONCURRENT_TASKS),
+        "user_max_running": ("IMAGE_USER_MAX_RUNNING", IMAGE_USER_MAX_RUNNING),
+        "user_max_inflight": ("IMAGE_USER_MAX_INFLIGHT", IMAGE_USER_MAX_INFLIGHT),
+        "project_max_running": ("IMAGE_PROJECT_MAX_RUNNING", IMAGE_PROJECT_MAX_RUNNING),
+        "project_max_inflight": ("IMAGE_PROJECT_MAX_INFLIGHT", IMAGE_PROJECT_MAX_INFLIGHT),
+    },
+    video_scheduler: {
+        "max_workers": ("VIDEO_MAX_CONCURRENT_TASKS", VIDEO_MAX_CONCURRENT_TASKS),
+        "bulk_max_workers": ("VIDEO_BULK_MAX_CONCURRENT_TASKS", VIDEO_BULK_MAX_CONCURRENT_TASKS),
+        "user_max_running": ("VIDEO_USER_MAX_RUNNING", VIDEO_USER_MAX_RUNNING),
+        "user_max_inflight": ("VIDEO_USER_MAX_INFLIGHT", VIDEO_USER_MAX_INFLIGHT),
+        "project_max_running": ("VIDEO_PROJECT_MAX_RUNNING", VIDEO_PROJECT_MAX_RUNNING),
+        "project_max_inflight": ("VIDEO_PROJECT_MAX_INFLIGHT", VIDEO_PROJECT_MAX_INFLIGHT),
+    },
+}
+
+
+def apply_scheduler_config(_changes=None) -> None:
+    for scheduler, limits in _SCHEDULER_LIMIT_KEYS.items():
+        scheduler.configure(**{name: live_int(key, default) for name, (key, default) in limits.items()})
+
+
+apply_scheduler_config()
+config_provider.subscribe(
+    apply_scheduler_config,
+    keys=[key for limits in _SCHEDULER_LIMIT_KEYS.values() for key, _ in limits.values()],
+)
+
+
+class _TaskHandle:
+    """本实例上排队/执行中的任务，供取消接口使用"""
+
+    __slots__ = ("table_name", "user_id", "loop", "future", "cancelled", "scheduler", "job")
+
+    def __init__(self, table_name: str, user_id: str):
+        self.table_name = table_name
+        self.user_id = user_id
+        self.loop = None
+        self.future = None
+        self.cancelled = False
+        self.scheduler = None
+        self.job = None
+
+
+_task_handles: Dict[str, _TaskHandle] = {}
+_task_handles_lock = threading.Lock()
+
+CANCELLABLE_STATUSES = ["isloading", "processing"]
+
+
+def _register_task(task_id: str, table_name: str, user_id: str) -> _TaskHandle:
+    handle = _TaskHandle(table_name, user_id or "")
+    with _task_handles_lock:
+        _task_handles[task_id] = handle
+    return handle
+
+
+def _unregister_task(task_id: str) -> None:
+    with _task_handles_lock:
+        _task_handles.pop(task_id, None)
+
+
+def _submit_task(task_id: str, handle: _TaskHandle, scheduler: GenerationScheduler, run, reservation, priority: str) -> None:
+    """提交到调度器并记录排队中的 job；提交前已被取消时立即移出队列"""
+    job = scheduler.submit(run, reservation=reservation, priority=priority)
+    with _task_handles_lock:
+        handle.scheduler = scheduler
+        handle.job = job
+        cancelled = handle.cancelled
+    if cancelled and scheduler.cancel(job):
+        _unregister_task(task_id)
+
+
+def _finish_task(task_id: str, handle: _TaskHandle) -> bool:
+    """生成协程正常结束后注销任务；返回 False 表示结束前已被取消（任务行已是 cancelled），不应再写 completed"""
+    with _task_handles_lock:
+        _task_handles.pop(task_id, None)
+        return not handle.cancelled
+
+
+def _run_cancellable(loop, handle: _TaskHandle, coro):
+    """在 loop 中执行 coro；任务被取消时抛 asyncio.CancelledError"""
+    future = loop.create_task(coro)
+    with _task_handles_lock:
+        handle.loop = loop
+        handle.future = future
+        if handle.cancelled:
+            future.cancel()
+    return loop.run_until_complete(future)
+
+
+def cancel_generation_task(table_name: str, task_id: str, user_id: str) -> str:
+    """取消本实例上排队或执行中的任务：排队中的移出队列，执行中的取消协程（视频会同时删除上游 Seedance 任务），
+    任务行标记为 cancelled，不计费。同步访问 Supabase，接口层需通过 run_in_executor 调用本函数。
+    返回 cancelled / not_found（不在本实例或已结束）/ forbidden（非任务创建者）"""
+    with _task_handles_lock:
+        handle = _task_handles.get(task_id)
+        if handle is None or handle.table_name != table_name:
+            return "not_found"
+        if handle.user_id and handle.user_id != user_id:
+            return "forbidden"
+        if handle.future is not None and handle.future.done():
+            # 生成协程已结束（已计费），即将写入 completed，按已结束处理
+            return "not_found"
+        handle.cancelled = True
+        loop, future = handle.loop, handle.future
+        scheduler, job = handle.scheduler, handle.job
+    if loop is not None and future is not None:
+        loop.call_soon_threadsafe(future.cancel)
+    elif scheduler is not None and scheduler.cancel(job):
+        # 仍在排队：移出队列，立即归还并发槽位与 in-flight 配额
+        _unregister_task(task_id)
+    try:
+        supabase_client.client.table(table_name).update(
+            {"status": "cancelled", "message": "任务已取消"}
+        ).eq("task_id", task_id).in_("status", CANCELLABLE_STATUSES).execute()
+    except Exception as e:
+        logger.error("Failed to mark %s task %s cancelled: %s", table_name, task_id, e)
+    return "cancelled"
+
+
+def _mark_failed(table_name: str, task_id: str, fields: Dict) -> None:
+    """仅在任务仍为进行中时写 failed，不覆盖已写入的 cancelled"""
+    supabase_client.batch_update_in(
+        table_name,
+        "status",
+        CANCELLABLE_STATUSES,
+        {"status": "failed", **fields},
+        extra_filters={"task_id": task_id},
+    )
+
 
 def _extract_reference_urls(reference_image_list) -> list:
-    """从 reference_image_list 提取 URL 列表，支持 {url} 和 {type:base64, data:...}"""
+    """从 reference_image_list 提取 URL 列表，支持 {url}、{reference_id}（见 /creez/references/upload）和 {type:base64, data:...}"""
+    from reference_image_helper import reference_id_to_url
+
     if not reference_image_list:
         return []
     urls = []
@@ -22,82 +196,137 @@ def _extract_reference_urls(reference_image_list) -> list:
         elif isinstance(item, dict):
             if item.get("url"):
                 urls.append(item["url"])
+            elif item.get("reference_id"):
+                urls.append(reference_id_to_url(item["reference_id"]))
             elif item.get("type") == "base64" and item.get("data"):
                 urls.append(item["data"])  # data URL 也支持
     return urls
 
 
-def fire_and_forget_generate_image(task_id: str = None, **kwargs):
+def fire_and_forget_generate_image(task_id: str = None, priority: str = PRIORITY_INTERACTIVE, **kwargs):
     from Tools.image_generator.image_generator import ImageGenerator
+    from Tools.image_generator.model_router import AUTO_MODEL, image_model_router
+    from derivative_helper import generate_image_derivatives
     from image_generation_helper import generate_and_save_image
 
     if not task_id:
         task_id = str(uuid4())
 
+    # 准入：超出用户/项目并发配额时抛 QuotaExceededException，不写任务行
+    reservation = image_scheduler.reserve(kwargs.get("user_id", ""), kwargs.get("project_id", ""))
+    model = kwargs.get("model", "doubao-seedream-4-0")
+    if model == AUTO_MODEL:
+        # auto：按实时延迟/错误率选同价位模型，实际模型记录在任务行与用量中
+        model = image_model_router.choose()
+    # 入队前写入任务行，排队期间轮询即可看到 isloading；同步访问 Supabase，接口层需通过 run_in_executor 调用本函数
+    try:
+        supabase_client.insert("image_tasks", {"task_id": task_id, "status": "isloading", "model": model})
+    except Exception:
+        image_scheduler.release(reservation)
+        raise
+    handle = _register_task(task_id, "image_tasks", kwargs.get("user_id", ""))
+
     def run():
+        if handle.cancelled:
+            _unregister_task(task_id)
+            return
         try:
             ids = token_usage_utils.prepare_ids_for_model_usage(**kwargs)
             ref_list = kwargs.get("reference_image_list") or []
             ref_urls = _extract_reference_urls(ref_list)
 
-            supabase_client.insert("image_tasks", {"task_id": task_id, "status": "isloading"})
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
                 generator = ImageGenerator()
-                urls = loop.run_until_complete(
+                urls = _run_cancellable(
+                    loop,
+                    handle,
                     generate_and_save_image(
                         image_generator=generator,
                         prompt=kwargs.get("prompt", ""),
-                        model=kwargs.get("model", "doubao-seedream-4-0"),
+                        model=model,
                         aspect_ratio=kwargs.get("aspect_ratio", "16:9"),
                         reference_images=ref_urls if ref_urls else None,
                         source="creez",
                         **ids,
                     )
                 )
-                supabase_client.update(
-                    "image_tasks", {"task_id": task_id}, {"status": "completed", "image_urls": urls}
+                if not _finish_task(task_id, handle):
+                    logger.info("Image task %s cancelled before completion was recorded", task_id)
+                    return
+                # 仅在仍为进行中时写 completed，不覆盖已写入的 cancelled
+                supabase_client.batch_update_in(
+                    "image_tasks",
+                    "status",
+                    CANCELLABLE_STATUSES,
+                    {"status": "completed", "image_urls": urls},
+                    extra_filters={"task_id": task_id},
                 )
+                # 任务已完成后再生成缩略图/预览图，不影响完成时延与任务状态
+                try:
+                    derivatives = loop.run_until_complete(generate_image_derivatives(urls))
+                    if derivatives:
+                        supabase_client.update("image_tasks", {"task_id": task_id}, {"derivatives": derivatives})
+                except Exception as e:
+                    logger.error("Image derivatives failed for %s: %s", task_id, e)
+            except asyncio.CancelledError:
+                logger.info("Image task %s cancelled", task_id)
             except OutOfQuotaException as e:
-                logger.error(f"Out of quota: {e}")
-                supabase_client.update("image_tasks", {"task_id": task_id}, {"status": "failed", "message": str(e)})
+                logger.error("Out of quota: %s", e)
+                _mark_failed("image_tasks", task_id, {"message": str(e)})
             except Exception as e:
-                logger.error(f"Image generation failed: {e}")
-                supabase_client.update("image_tasks", {"task_id": task_id}, {"status": "failed", "image_urls": []})
+                logger.error("Image generation failed: %s", e)
+                _mark_failed("image_tasks", task_id, {"image_urls": []})
             finally:
                 loop.close()
         except Exception as e:
-            logger.error(f"Task runner error: {e}")
+            logger.error("Task runner error: %s", e)
             try:
-                supabase_client.update("image_tasks", {"task_id": task_id}, {"status": "failed", "message": str(e)})
+                _mark_failed("image_tasks", task_id, {"message": str(e)})
             except Exception:
                 pass
+        finally:
+            _unregister_task(task_id)
 
-    t = threading.Thread(target=run, daemon=False)
-    t.start()
+    _submit_task(task_id, handle, image_scheduler, run, reservation, priority)
     return task_id
 
 
-def fire_and_forget_generate_video(task_id: str = None, **kwargs):
+def fire_and_forget_generate_video(task_id: str = None, priority: str = PRIORITY_INTERACTIVE, **kwargs):
     from Tools.video_generator.video_generator import VideoGenerator
+    from derivative_helper import generate_video_derivatives
     from video_generation_helper import generate_and_save_video
 
     if not task_id:
         task_id = str(uuid4())
 
+    # 准入：超出用户/项目并发配额时抛 QuotaExceededException，不写任务行
+    reservation = video_scheduler.reserve(kwargs.get("user_id", ""), kwargs.get("project_id", ""))
+    # 入队前写入任务行，排队期间轮询即可看到 isloading；同步访问 Supabase，接口层需通过 run_in_executor 调用本函数
+    try:
+        supabase_client.insert("video_tasks", {"task_id": task_id, "status": "isloading"})
+    except Exception:
+        video_scheduler.release(reservation)
+        raise
+    handle = _register_task(task_id, "video_tasks", kwargs.get("user_id", ""))
+
     def run():
+        if handle.cancelled:
+            _unregister_task(task_id)
+            return
         try:
             ids = token_usage_utils.prepare_ids_for_model_usage(**kwargs)
             first_frame = kwargs.get("first_frame_image") or kwargs.get("first_frame") or ""
             last_frame = kwargs.get("last_frame_image") or kwargs.get("last_frame")
 
-            supabase_client.insert("video_tasks", {"task_id": task_id, "status": "isloading"})
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
                 generator = VideoGenerator()
-                urls = loop.run_until_complete(
+                urls = _run_cancellable(
+                    loop,
+                    handle,
                     generate_and_save_video(
                         video_generator=generator,
                         prompt=kwargs.get("prompt", ""),
@@ -111,24 +340,44 @@ def fire_and_forget_generate_video(task_id: str = None, **kwargs):
                         **ids,
                     )
                 )
-                supabase_client.update(
-                    "video_tasks", {"task_id": task_id}, {"status": "completed", "video_urls": urls}
+                if not _finish_task(task_id, handle):
+                    logger.info("Video task %s cancelled before completion was recorded", task_id)
+                    return
+                # 仅在仍为进行中时写 completed，不覆盖已写入的 cancelled
+                supabase_client.batch_update_in(
+                    "video_tasks",
+                    "status",
+                    CANCELLABLE_STATUSES,
+                    {"status": "completed", "video_urls": urls},
+                    extra_filters={"task_id": task_id},
                 )
+                # 任务已完成后再生成封面/预览，不影响完成时延与任务状态
+                try:
+                    derivatives = loop.run_until_complete(
+                        generate_video_derivatives(urls, first_frame_image=first_frame or None)
+                    )
+                    if derivatives:
+                        supabase_client.update("video_tasks", {"task_id": task_id}, {"derivatives": derivatives})
+                except Exception as e:
+                    logger.error("Video derivatives failed for %s: %s", task_id, e)
+            except asyncio.CancelledError:
+                logger.info("Video task %s cancelled", task_id)
             except OutOfQuotaException as e:
-                logger.error(f"Out of quota: {e}")
-                supabase_client.update("video_tasks", {"task_id": task_id}, {"status": "failed", "message": str(e)})
+                logger.error("Out of quota: %s", e)
+                _mark_failed("video_tasks", task_id, {"message": str(e)})
             except Exception as e:
-                logger.error(f"Video generation failed: {e}")
-                supabase_client.update("video_tasks", {"task_id": task_id}, {"status": "failed", "video_urls": []})
+                logger.error("Video generation failed: %s", e)
+                _mark_failed("video_tasks", task_id, {"video_urls": []})
             finally:
                 loop.close()
         except Exception as e:
-            logger.error(f"Task runner error: {e}")
+            logger.error("Task runner error: %s", e)
             try:
-                supabase_client.update("video_tasks", {"task_id": task_id}, {"status": "failed", "message": str(e)})
+                _mark_failed("video_tasks", task_id, {"message": str(e)})
             except Exception:
                 pass
+        finally:
+            _unregister_task(task_id)
 
-    t = threading.Thread(target=run, daemon=False)
-    t.start()
+    _submit_task(task_id, handle, video_scheduler, run, reservation, priority)
     return task_id
@@ -3,6 +3,7 @@ import json
 from datetime import datetime
 
 from log_util import get_logger
+from row_models import UserBalanceRow
 from supabase_client import supabase_client
 
 logger = get_logger(__name__)
@@ -45,7 +46,7 @@ async def save_model_usage_async(**kwargs):
     loop = asyncio.get_event_loop()
     try:
         await loop.run_in_executor(None, supabase_client.insert, "token_usage", data)
-        logger.info(f"Saved model usage: {list(data.keys())}")
+        logger.info("Saved model usage: %s", list(data.keys()))
 
         usage_type = data.get("type")
         user_id = data.get("user_id")
@@ -54,9 +55,9 @@ async def save_model_usage_async(**kwargs):
         if user_id and points and points > 0 and usage_type in ["image", "video", "audio"]:
             success = await deduct_user_balance(user_id, points)
             if not success:
-                logger.warning(f"Failed to deduct {points} points from user {user_id}")
+                logger.warning("Failed to deduct %s points from user %s", points, user_id)
     except Exception as e:
-        logger.error(f"Failed to save model usage: {e}, data={list(data.keys())}")
+        logger.error("Failed to save model usage: %s, data=%s", e, list(data.keys()))
 
 
 async def save_image_usage_async(model_name: str, prompt: str, aspect_ratio: str, urls, **kwargs):
@@ -98,16 +99,16 @@ async def check_user_points(user_id: str) -> bool:
         ub_rows = supabase_client.select(
             table="user_balance",
             filters={"user_id": user_id},
-            columns=["balance", "granted_credits"],
+            row_model=UserBalanceRow,
         )
         if not ub_rows:
-            logger.error(f"User {user_id} has no balance record")
+            logger.error("User %s has no balance record", user_id)
             return False
-        balance = int(ub_rows[0].get("balance", 0) or 0)
-        granted_credits = int(ub_rows[0].get("granted_credits", 0) or 0)
+        balance = int(ub_rows[0].balance or 0)
+        granted_credits = int(ub_rows[0].granted_credits or 0)
         return (balance + granted_credits) >= 0
     except Exception as e:
-        logger.error(f"Failed to check user points: {e}")
+        logger.error("Failed to check user points: %s", e)
         return False
 
 
@@ -116,13 +117,13 @@ async def deduct_user_balance(user_id: str, points: int) -> bool:
         ub_rows = supabase_client.select(
             table="user_balance",
             filters={"user_id": user_id},
-            columns=["id", "balance", "granted_credits"],
+            row_model=UserBalanceRow,
         )
         if not ub_rows:
             raise Exception(f"User {user_id} balance record not found")
 
-        current_balance = int(ub_rows[0].get("balance", 0) or 0)
-        current_granted_credits = int(ub_rows[0].get("granted_credits", 0) or 0)
+        current_balance = int(ub_rows[0].balance or 0)
+        current_granted_credits = int(ub_rows[0].granted_credits or 0)
 
         new_granted_credits = max(0, current_granted_credits - points)
         granted_credits_used = current_granted_credits - new_granted_credits
@@ -140,5 +141,5 @@ async def deduct_user_balance(user_id: str, points: int) -> bool:
         )
         return True
     except Exception as e:
-        logger.error(f"Failed to deduct user balance: {e}")
+        logger.error("Failed to deduct user balance: %s", e)
         return False
@@ -2,7 +2,10 @@ import json
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List
 
+from archive import lookup_archived_tasks
+from config import ARCHIVE_READ_THROUGH_ENABLED
 from log_util import get_logger
+from row_models import table_columns
 from supabase_client import supabase_client
 
 logger = get_logger(__name__)
@@ -18,13 +21,11 @@ def poll_tasks_with_timeout_check(
     if not task_ids:
         return {}
 
-    result = (
-        supabase_client.client.table(table_name)
-        .select("*")
-        .in_("task_id", task_ids)
-        .execute()
-    )
-    data = result.data
+    # 只查询行模型声明的列，并直接复用查询返回的行 dict 作为响应项（响应本身就是 dict，不再转换为行模型）
+    columns = table_columns(table_name) or [
+        "task_id", "status", url_field_name, "message", "derivatives", "created_at"
+    ]
+    data = supabase_client.select(table_name, filters={"task_id__in_": task_ids}, columns=columns)
 
     current_time = datetime.now(timezone.utc)
     overtime_task_ids = []
@@ -32,33 +33,35 @@ def poll_tasks_with_timeout_check(
 
     for item in data:
         task_id = item.get("task_id", "")
-        status = item.get("status", "")
-        urls = item.get(url_field_name, [""])
-        message = item.get("message", "")
-        created_at_str = item.get("created_at", "")
+        created_at_str = item.pop("created_at", "")
+        if not item.get("derivatives"):
+            item["derivatives"] = {}
 
-        if created_at_str:
+        if created_at_str and item.get("status") in ("processing", "isloading"):
             try:
                 created_at = datetime.fromisoformat(
                     created_at_str.replace("+00", "+00:00")
                 )
-                time_diff = current_time - created_at
-                if (
-                    time_diff > timedelta(minutes=timeout_minutes)
-                    and status in ["processing", "isloading"]
-                ):
+                if current_time - created_at > timedelta(minutes=timeout_minutes):
                     overtime_task_ids.append(task_id)
-                    status = "overtime"
-                    message = "内容生成超时"
+                    item["status"] = "overtime"
+                    item["message"] = "内容生成超时"
             except Exception as e:
-                logger.error(f"Error parsing created_at for task {task_id}: {e}")
+                logger.error("Error parsing created_at for task %s: %s", task_id, e)
 
-        result_data[task_id] = {
-            "task_id": task_id,
-            "status": status,
-            url_field_name: urls,
-            "message": message,
-        }
+        result_data[task_id] = item
+
+    # 热表中没有的任务可能已被归档（archive.py），回读归档分区
+    missing = [t for t in task_ids if t not in result_data]
+    if missing and ARCHIVE_READ_THROUGH_ENABLED:
+        try:
+            archived = lookup_archived_tasks(table_name, missing, [c for c in columns if c != "created_at"])
+            for item in archived.values():
+                if not item.get("derivatives"):
+                    item["derivatives"] = {}
+            result_data.update(archived)
+        except Exception as e:
+            logger.error("Error reading archived %s tasks: %s", table_name, e)
 
     if overtime_task_ids:
         try:
@@ -69,10 +72,10 @@ def poll_tasks_with_timeout_check(
                 data={"status": "overtime", "message": "内容生成超时"},
             )
             logger.info(
-                f"Batch updated {len(overtime_task_ids)} overtime {table_name} tasks"
+                "Batch updated %s overtime %s tasks", len(overtime_task_ids), table_name
             )
         except Exception as e:
-            logger.error(f"Error batch updating overtime {table_name} tasks: {e}")
+            logger.error("Error batch updating overtime %s tasks: %s", table_name, e)
 
     return result_data
 
@@ -105,7 +108,7 @@ def get_file_content(project_id: str) -> tuple:
             return project_config, other_files
         return {}, {}
     except Exception as e:
-        logger.error(f"Failed to load file_content for project {project_id}: {e}")
+        logger.error("Failed to load file_content for project %s: %s", project_id, e)
         return {}, {}
 
 
@@ -120,5 +123,5 @@ def parse_project_config(project_config: dict) -> dict:
                 return json.loads(content_str) if isinstance(content_str, str) else content_str
         return {}
     except Exception as e:
-        logger.error(f"Failed to parse project config: {e}")
+        logger.error("Failed to parse project config: %s", e)
         return {}
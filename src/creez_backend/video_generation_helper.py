@@ -4,6 +4,7 @@ from uuid import uuid4
 
 from exceptions.self_defined import OutOfQuotaException
 from log_util import get_logger
+from reference_image_helper import VIDEO_REFERENCE_MAX_SIDE, normalize_reference_url
 from Storage.volc_tos import volc_tos_client
 from Tools.utils_price_calculator import video_price_calculator
 import token_usage_utils
@@ -26,6 +27,10 @@ async def generate_and_save_video(
     if user_id and not await token_usage_utils.check_user_points(user_id):
         raise OutOfQuotaException("积分已用完，请明日再试或充值后再试")
 
+    if image:
+        image = await normalize_reference_url(image, VIDEO_REFERENCE_MAX_SIDE)
+    if image_tail:
+        image_tail = await normalize_reference_url(image_tail, VIDEO_REFERENCE_MAX_SIDE)
     gen_result = await video_generator.generate_video(
         image=image or "",
         prompt=prompt,
@@ -53,14 +58,14 @@ async def generate_and_save_video(
                 url = volc_tos_client.upload_object(VOLC_TOS_BUCKET, object_name, vid_bytes)
                 uploaded_urls.append(url)
             except Exception as e:
-                logger.error(f"Upload base64 video failed: {e}")
+                logger.error("Upload base64 video failed: %s", e)
                 continue
         elif vid_type == "url":
             try:
                 url = volc_tos_client.upload_url_content(VOLC_TOS_BUCKET, object_name, data)
                 uploaded_urls.append(url)
             except Exception as e:
-                logger.error(f"Upload url video failed: {e}")
+                logger.error("Upload url video failed: %s", e)
                 continue
 
     if not uploaded_urls:
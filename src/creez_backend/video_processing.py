@@ -0,0 +1,54 @@
+"""视频处理（ffmpeg）：抽取封面帧、转码低码率预览。在进程池中执行，只依赖标准库。"""
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Dict, Optional
+
+_FFMPEG_TIMEOUT_SECONDS = 120
+
+
+def ffmpeg_path() -> Optional[str]:
+    return shutil.which("ffmpeg")
+
+
+def ffmpeg_video_derivatives(
+    video: bytes,
+    preview_height: int = 360,
+    preview_crf: int = 32,
+) -> Dict[str, bytes]:
+    """用 ffmpeg 从视频抽取封面 JPEG（poster）与无音轨低码率 MP4（preview）。
+    未安装 ffmpeg 返回 {}；单项失败时该项缺失。"""
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        return {}
+
+    result = {}
+    with tempfile.TemporaryDirectory(prefix="creez_video_") as tmp:
+        src = os.path.join(tmp, "src.mp4")
+        with open(src, "wb") as f:
+            f.write(video)
+
+        commands = {
+            "poster": (
+                os.path.join(tmp, "poster.jpg"),
+                [ffmpeg, "-y", "-loglevel", "error", "-i", src, "-frames:v", "1", "-q:v", "3"],
+            ),
+            "preview": (
+                os.path.join(tmp, "preview.mp4"),
+                [
+                    ffmpeg, "-y", "-loglevel", "error", "-i", src,
+                    "-vf", f"scale=-2:{preview_height}",
+                    "-c:v", "libx264", "-preset", "veryfast", "-crf", str(preview_crf),
+                    "-an", "-movflags", "+faststart",
+                ],
+            ),
+        }
+        for name, (out_path, cmd) in commands.items():
+            try:
+                subprocess.run(cmd + [out_path], check=True, capture_output=True, timeout=_FFMPEG_TIMEOUT_SECONDS)
+                with open(out_path, "rb") as f:
+                    result[name] = f.read()
+            except (subprocess.SubprocessError, OSError):
+                continue
+    return result